@@ -1,20 +1,84 @@
+import argparse
 import logging
-from helpersMailChimp import *
-from helpersCtteesAPI import *
+from helpersMailChimp import GROUP_ID, create_group_interest, create_group_interests, fetch_interests, get_config
+from helpersCtteesAPI import fetch_committees_dict
 import helpersCSVMapping
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
-def main():
+# The committees each house's mapping is provisioned from: (category, committee types)
+HOUSE_COMMITTEES = {
+    'Commons': ('Select', '(HC) Public Standing Orders - Departmental'),
+    'Lords': ('Select', None),
+    'Joint': ('Select', None),
+}
+
+def bulk_provision(cttees: dict, dry_run: bool = False, house: str = 'Commons') -> list:
+    """
+    Brings house's mapping (mapping.csv for the Commons) and the MailChimp
+    committee group in line with cttees.
+
+    Committees already in any house's mapping are left alone. Committees whose name
+    already exists as an interest are mapped to it without a new POST. Only
+    the remaining ones get new interests, created concurrently. The mapping
+    is then rewritten once, atomically, with every row that succeeded, even
+    if some creations failed.
+
+    Returns the (cttee_id, cttee_name, interest_id) rows that were added.
+    """
+    registry = helpersCSVMapping.get_registry(helpersCSVMapping.HOUSE_MAPPING_FILEPATHS[house])
+    # Every house shares the one interest group, so check against all mappings
+    mapped = helpersCSVMapping.get_pipeline_registry(helpersCSVMapping.HOUSES)
+    mapped_ids = mapped.cttee_ids()
+
+    interests_by_name = {
+        i.get("name"): i.get("id")
+        for i in fetch_interests(get_config()["audience_id"], GROUP_ID)
+        if mapped.get_by_interest(i.get("id")) is None
+    }
+
+    new_rows = []
+    to_create = {}
+    for cttee_id, cttee_value in cttees.items():
+        if cttee_id in mapped_ids:
+            continue
+        cttee_name = cttee_value['name']
+        if cttee_name in interests_by_name:
+            logger.info(f"{cttee_name}: reusing existing interest {interests_by_name[cttee_name]}")
+            new_rows.append((cttee_id, cttee_name, interests_by_name[cttee_name]))
+        else:
+            to_create[cttee_id] = cttee_name
+
+    logger.info(f"{len(cttees)} committees: {len(mapped_ids & set(cttees))} already mapped, "
+                f"{len(new_rows)} matched to existing interests, {len(to_create)} to create.")
+    if dry_run:
+        for cttee_id, cttee_name in to_create.items():
+            print(f"Would create interest for {cttee_id} {cttee_name}")
+        return new_rows + [(cttee_id, cttee_name, None) for cttee_id, cttee_name in to_create.items()]
+
+    created, failed = create_group_interests(to_create)
+    for cttee_id, interest in created.items():
+        new_rows.append((cttee_id, to_create[cttee_id], interest.get("id")))
+    if failed:
+        logger.warning(f"Could not create interests for {len(failed)} committees: "
+                       f"{', '.join(str(cttee_id) for cttee_id in failed)}. Re-run to retry them.")
+
+    added = [row for row in new_rows if registry.add(*row)]
+    if added:
+        registry.save()
+        logger.info(f"Added {len(added)} rows to {registry.filepath}.")
+    return added
+
+def main(bulk: bool = False, dry_run: bool = False, house: str = 'Commons'):
     # cttee_id = input("Committee id?").strip()
     # try:
     #     cttee_id = int(cttee_id)
     # except ValueError as e:
     #     logger.debug(f"Error: must enter integer value: {e}")
     #     return
-    
-    cttees = fetch_committees_dict('Select', '(HC) Public Standing Orders - Departmental', False)
+
+    category, cttee_types = HOUSE_COMMITTEES[house]
+    cttees = fetch_committees_dict(category, cttee_types, False, house=house)
 
     # if cttee_id in cttees:
     #     cttee_name = cttees[cttee_id]['name']
@@ -22,14 +86,32 @@ def main():
     # else:
     #     logger.warning(f"{cttee_name} found on committees API.")
     #     return
-    
-    for cttee_id, cttee_value in cttees.items():
-        cttee_name = cttee_value['name']
-        interest = create_group_interest(cttee_name)
-        interest_id = interest.get("id")
-        helpersCSVMapping.update_mapping_CSV(cttee_id, cttee_name, interest_id) #campaign_id, interest_id)
 
-if __name__ == "__main__":
-    main()
+    if bulk or dry_run:
+        bulk_provision(cttees, dry_run=dry_run, house=house)
+        return
 
+    # Rows are written in one go at the end, including after a failed creation
+    rows = []
+    try:
+        for cttee_id, cttee_value in cttees.items():
+            cttee_name = cttee_value['name']
+            interest = create_group_interest(cttee_name)
+            interest_id = interest.get("id")
+            rows.append((cttee_id, cttee_name, interest_id)) #campaign_id, interest_id)
+    finally:
+        helpersCSVMapping.update_mapping_CSV_rows(rows, house)
 
+if __name__ == "__main__":
+    import helpersProfile
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Create MailChimp interests for committees and map them.")
+    parser.add_argument("--bulk", action="store_true",
+                        help="Create only missing interests, concurrently, and rewrite the mapping once.")
+    parser.add_argument("--dry-run", action="store_true", help="Show what --bulk would create without changing anything.")
+    parser.add_argument("--house", choices=helpersCSVMapping.HOUSES, default="Commons",
+                        help="House whose committees to map, each in its own mapping file.")
+    helpersProfile.add_profile_arguments(parser)
+    args = parser.parse_args()
+    with helpersProfile.stage(helpersProfile.profiler_from_args(args), "add-committees"):
+        main(bulk=args.bulk, dry_run=args.dry_run, house=args.house)
@@ -0,0 +1,104 @@
+"""
+Scaling benchmark for generate_htmls on synthetic data.
+
+    python benchmarks/bench_generate_scaling.py
+    python benchmarks/bench_generate_scaling.py --committees 22,100,300,600 --days 6,30
+
+For each (committee count, window length) point a synthetic dataset is
+generated and generate_htmls.main() is timed in a fresh subprocess, so peak
+RSS belongs to that point alone. Import time is reported separately and left
+out of the wall time the slopes are fitted to. The report ends with the fitted log-log
+slope of time against committee count and against item count: ~1.0 is
+linear, ~2.0 means rendering is quadratic in that dimension.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+from bench_pipeline import REPO_ROOT, RESULTS_DIR, git_commit, run_stage
+from synthetic_data import generate_dataset, write_dataset
+
+def output_bytes(workdir):
+    htmls = os.path.join(workdir, "docs", "HTMLs")
+    return sum(os.path.getsize(os.path.join(htmls, name)) for name in os.listdir(htmls))
+
+def measure(committees, days, attendees, seed, repeat):
+    data, rows = generate_dataset(committees=committees, days=days, attendees_per_activity=attendees, seed=seed)
+    items = len(data["events"]) + len(data["publications"]) + len(data["news"])
+    samples = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as workdir:
+            write_dataset(workdir, data, rows)
+            os.makedirs(os.path.join(workdir, "docs", "HTMLs"))
+            result = run_stage("render", workdir, dict(os.environ, PYTHONPATH=REPO_ROOT))
+            result["output_bytes"] = output_bytes(workdir)
+            samples.append(result)
+    return {
+        "committees": committees,
+        "days": days,
+        "attendees_per_activity": attendees,
+        "items": items,
+        "wall_seconds": sorted(s["wall_seconds"] for s in samples)[len(samples) // 2],
+        "import_seconds": sorted(s["import_seconds"] for s in samples)[len(samples) // 2],
+        "peak_rss_kb": max(s["peak_rss_kb"] for s in samples),
+        "output_bytes": samples[-1]["output_bytes"],
+    }
+
+def loglog_slope(xs, ys):
+    """Least-squares slope of log(y) against log(x); None if undetermined."""
+    points = [(math.log(x), math.log(y)) for x, y in zip(xs, ys) if x > 0 and y > 0]
+    if len(points) < 2:
+        return None
+    mean_x = sum(p[0] for p in points) / len(points)
+    mean_y = sum(p[1] for p in points) / len(points)
+    var = sum((p[0] - mean_x) ** 2 for p in points)
+    if var == 0:
+        return None
+    return sum((p[0] - mean_x) * (p[1] - mean_y) for p in points) / var
+
+def main():
+    parser = argparse.ArgumentParser(description="Time and memory of generate_htmls against dataset size.")
+    parser.add_argument("--committees", default="22,100,300", help="Comma-separated committee counts.")
+    parser.add_argument("--days", default="6,30", help="Comma-separated window lengths in days.")
+    parser.add_argument("--attendees", type=int, default=4, help="Attendees per oral evidence activity.")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Result file (default benchmarks/results/<commit>-scaling.json).")
+    args = parser.parse_args()
+
+    committee_counts = [int(c) for c in args.committees.split(",")]
+    day_counts = [int(d) for d in args.days.split(",")]
+
+    points = []
+    print(f"{'cttees':>7} {'days':>5} {'items':>7} {'wall s':>9} {'import s':>9} {'peak RSS MB':>12} {'output KB':>10}")
+    for days in day_counts:
+        for committees in committee_counts:
+            point = measure(committees, days, args.attendees, args.seed, args.repeat)
+            points.append(point)
+            print(f"{committees:>7} {days:>5} {point['items']:>7} {point['wall_seconds']:>9.3f} {point['import_seconds']:>9.3f} "
+                  f"{point['peak_rss_kb'] / 1024:>12.1f} {point['output_bytes'] / 1024:>10.1f}")
+
+    slopes = {}
+    for days in day_counts:
+        row = [p for p in points if p["days"] == days]
+        slopes[f"time_vs_committees_days_{days}"] = loglog_slope(
+            [p["committees"] for p in row], [p["wall_seconds"] for p in row])
+    slopes["time_vs_items"] = loglog_slope([p["items"] for p in points], [p["wall_seconds"] for p in points])
+    slopes["rss_vs_items"] = loglog_slope([p["items"] for p in points], [p["peak_rss_kb"] for p in points])
+    for name, slope in slopes.items():
+        print(f"slope {name}: {'n/a' if slope is None else f'{slope:.2f}'}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{git_commit()}-scaling.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"commit": git_commit(), "points": points, "slopes": slopes}, f, indent=4)
+    print(f"Saved {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Import-time benchmark for the entry points and helper modules.
+
+    python benchmarks/bench_import_time.py              # report, exit 1 on regression
+    python benchmarks/bench_import_time.py --repeat 9
+
+Each target is imported in a fresh interpreter with `python -X importtime`
+and the cumulative time for the target module is read from stderr. The
+median over repeats is checked against a budget, and light targets are
+also checked for modules they must not load at import (requests, lxml,
+sqlite3, thread pools). `cli.py --help` is timed end to end as well.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+
+HEAVY_MODULES = ("requests", "lxml", "sqlite3", "concurrent.futures")
+
+# target module -> (budget in ms, modules it must not import)
+TARGETS = {
+    "cli": (30, HEAVY_MODULES),
+    "helpersHTTP": (30, HEAVY_MODULES),
+    "helpersCSVMapping": (30, HEAVY_MODULES),
+    "helpersCtteesAPI": (40, HEAVY_MODULES),
+    "helpersMailChimp": (40, HEAVY_MODULES),
+    "runPipeline": (40, HEAVY_MODULES),
+    "sendUpdates": (50, HEAVY_MODULES),
+    "addCttee": (50, HEAVY_MODULES),
+    "generate_htmls": (250, ()),
+}
+CLI_HELP_BUDGET_MS = 150
+
+def measure_import(module):
+    """Returns (cumulative microseconds for module, set of modules imported)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, env=dict(os.environ, PYTHONPATH=REPO_ROOT),
+        capture_output=True, text=True, check=True,
+    )
+    cumulative = None
+    imported = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            cumulative_us = int(parts[1])
+        except ValueError:
+            continue  # header line
+        name = parts[2].strip()
+        imported.add(name)
+        if name == module:
+            cumulative = cumulative_us
+    return cumulative or 0, imported
+
+def measure_cli_help():
+    started = time.perf_counter()
+    subprocess.run([sys.executable, os.path.join(REPO_ROOT, "cli.py"), "--help"],
+                   cwd=REPO_ROOT, capture_output=True, check=True)
+    return (time.perf_counter() - started) * 1000
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Guard import time and import side effects.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Multiply every budget, e.g. 2 on a slow CI runner.")
+    args = parser.parse_args(argv)
+
+    failures = []
+    print(f"{'module':<20} {'median ms':>10} {'budget ms':>10}")
+    for module, (budget_ms, forbidden) in TARGETS.items():
+        samples = []
+        imported = set()
+        for _ in range(args.repeat):
+            cumulative_us, imported = measure_import(module)
+            samples.append(cumulative_us / 1000)
+        median_ms = statistics.median(samples)
+        budget_ms *= args.scale
+        print(f"{module:<20} {median_ms:>10.1f} {budget_ms:>10.0f}")
+        if median_ms > budget_ms:
+            failures.append(f"{module}: import took {median_ms:.1f}ms (budget {budget_ms:.0f}ms)")
+        loaded = sorted(m for m in forbidden if m in imported)
+        if loaded:
+            failures.append(f"{module}: imports {', '.join(loaded)} at import time")
+
+    help_ms = statistics.median(measure_cli_help() for _ in range(args.repeat))
+    help_budget = CLI_HELP_BUDGET_MS * args.scale
+    print(f"{'cli.py --help':<20} {help_ms:>10.1f} {help_budget:>10.0f}")
+    if help_ms > help_budget:
+        failures.append(f"cli.py --help took {help_ms:.1f}ms (budget {help_budget:.0f}ms)")
+
+    for line in failures:
+        print(f"REGRESSION {line}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+End-to-end pipeline benchmark: fetch -> render -> send.
+
+Record the parliament APIs once (needs network, does not touch MailChimp):
+    python benchmarks/bench_pipeline.py record --fixtures fixtures/http
+
+Benchmark against the recording; the send stage runs against the local fake
+MailChimp server so no real campaigns are created:
+    python benchmarks/bench_pipeline.py run --fixtures fixtures/http --repeat 3
+
+Compare two result files and fail on regressions:
+    python benchmarks/bench_pipeline.py compare benchmarks/results/abc123.json benchmarks/results/def456.json
+
+Each stage runs in its own subprocess so peak RSS is per stage. Results are
+written to benchmarks/results/<commit>.json with wall time, request count,
+bytes transferred and peak RSS for each stage. Wall time covers the stage's
+main() only; the time to import its module is reported separately.
+"""
+import argparse
+import csv
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+STAGES = ("fetch", "render", "send")
+DEFAULT_WALL_TOLERANCE = 0.10  # 10% slower counts as a regression
+DEFAULT_RSS_TOLERANCE = 0.10
+
+# stage -> module whose main() runs it
+STAGE_MODULES = {
+    "fetch": "fetch_parliament_data",
+    "render": "generate_htmls",
+    "send": "sendUpdates",
+}
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def prepare_workspace(workdir, mapping_csv):
+    shutil.copy(mapping_csv, os.path.join(workdir, "mapping.csv"))
+    os.makedirs(os.path.join(workdir, "docs", "HTMLs"), exist_ok=True)
+
+def run_stage_child(stage, workdir, result_path):
+    """Runs one stage in this (child) process and writes its metrics as JSON."""
+    import contextlib
+    import importlib
+    import io
+    import resource
+
+    sys.path.insert(0, REPO_ROOT)
+    os.chdir(workdir)
+    # Imports (interpreter start-up aside, mostly lxml and requests) are a
+    # fixed cost per process; timed apart so wall time scales with the work
+    started = time.perf_counter()
+    module = importlib.import_module(STAGE_MODULES[stage])
+    import_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        module.main()
+    wall = time.perf_counter() - started
+
+    import helpersHTTP
+    http_stats = helpersHTTP.stats() if helpersHTTP._transport is not None else {
+        "requests": 0, "bytes_received": 0, "bytes_sent": 0}
+    result = {
+        "wall_seconds": wall,
+        "import_seconds": import_seconds,
+        **http_stats,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+    with open(result_path, "w") as f:
+        json.dump(result, f)
+
+def run_stage(stage, workdir, env):
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp:
+        result_path = tmp.name
+    try:
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "_stage", stage, workdir, result_path],
+            env=env, check=True,
+        )
+        with open(result_path) as f:
+            return json.load(f)
+    finally:
+        os.remove(result_path)
+
+def seed_fake_mailchimp(server, workdir):
+    sys.path.insert(0, BENCH_DIR)
+    from loadtest_send import FAKE_AUDIENCE_ID, FAKE_GROUP_ID
+
+    server.state.add_category(FAKE_AUDIENCE_ID, "Committees", category_id=FAKE_GROUP_ID)
+    with open(os.path.join(workdir, "mapping.csv"), newline="", encoding="utf-8") as f:
+        for row in list(csv.reader(f))[1:]:
+            if len(row) >= 3:
+                server.state.add_interest(FAKE_AUDIENCE_ID, FAKE_GROUP_ID, row[1], 10, interest_id=row[2].strip())
+    return {
+        "API_KEY": "fake-key",
+        "DATA_CENTRE": "fake",
+        "AUDIENCE_ID": FAKE_AUDIENCE_ID,
+        "MAILCHIMP_BASE_URL": server.base_url,
+        "HTTP_MODE": "live",
+    }
+
+def run_pipeline_once(fixtures_dir, mapping_csv, stages):
+    sys.path.insert(0, REPO_ROOT)
+    sys.path.insert(0, BENCH_DIR)
+    import helpersHTTP
+    from fake_mailchimp import FakeMailChimpConfig, FakeMailChimpServer
+
+    manifest = helpersHTTP.read_manifest(fixtures_dir)
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        prepare_workspace(workdir, mapping_csv)
+        base_env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+        for stage in stages:
+            env = dict(base_env)
+            if stage == "fetch":
+                env.update({
+                    "HTTP_MODE": "replay",
+                    "HTTP_FIXTURES_DIR": os.path.abspath(fixtures_dir),
+                    "PIPELINE_AS_OF": manifest.get("as_of", ""),
+                })
+                results[stage] = run_stage(stage, workdir, env)
+            elif stage == "send":
+                with FakeMailChimpServer(FakeMailChimpConfig(max_concurrent=None)) as server:
+                    env.update(seed_fake_mailchimp(server, workdir))
+                    results[stage] = run_stage(stage, workdir, env)
+            else:
+                results[stage] = run_stage(stage, workdir, env)
+    return results
+
+def summarise(runs):
+    """Median wall time across repeats; the other counters should not vary."""
+    summary = {}
+    for stage in runs[0]:
+        samples = [run[stage] for run in runs]
+        summary[stage] = {
+            "wall_seconds": statistics.median(s["wall_seconds"] for s in samples),
+            "wall_seconds_min": min(s["wall_seconds"] for s in samples),
+            "import_seconds": statistics.median(s["import_seconds"] for s in samples),
+            "requests": samples[-1]["requests"],
+            "bytes_received": samples[-1]["bytes_received"],
+            "bytes_sent": samples[-1]["bytes_sent"],
+            "peak_rss_kb": max(s["peak_rss_kb"] for s in samples),
+        }
+    return summary
+
+def cmd_record(args):
+    sys.path.insert(0, REPO_ROOT)
+    import helpersHTTP
+
+    as_of = datetime.now(timezone.utc).isoformat()
+    os.makedirs(args.fixtures, exist_ok=True)
+    with tempfile.TemporaryDirectory() as workdir:
+        prepare_workspace(workdir, args.mapping)
+        env = dict(os.environ, PYTHONPATH=REPO_ROOT, HTTP_MODE="record",
+                   HTTP_FIXTURES_DIR=os.path.abspath(args.fixtures), PIPELINE_AS_OF=as_of)
+        result = run_stage("fetch", workdir, env)
+    helpersHTTP.write_manifest(args.fixtures, as_of=as_of, stages=["fetch"])
+    print(f"Recorded {result['requests']} responses ({result['bytes_received']} bytes) to {args.fixtures}")
+
+def cmd_run(args):
+    stages = args.stages.split(",") if args.stages else list(STAGES)
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise SystemExit(f"Unknown stage(s): {', '.join(sorted(unknown))}")
+    runs = [run_pipeline_once(args.fixtures, args.mapping, stages) for _ in range(args.repeat)]
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "repeat": args.repeat,
+        "stages": summarise(runs),
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{report['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=4)
+
+    print(f"{'stage':<8} {'wall s':>9} {'import s':>9} {'requests':>9} {'bytes in':>11} {'bytes out':>10} {'peak RSS MB':>12}")
+    for stage, m in report["stages"].items():
+        print(f"{stage:<8} {m['wall_seconds']:>9.3f} {m['import_seconds']:>9.3f} {m['requests']:>9} {m['bytes_received']:>11} "
+              f"{m['bytes_sent']:>10} {m['peak_rss_kb'] / 1024:>12.1f}")
+    print(f"Saved {output}")
+
+def compare_reports(base, head, wall_tolerance, rss_tolerance):
+    """Returns a list of human-readable regressions of head against base."""
+    regressions = []
+    for stage, b in base["stages"].items():
+        h = head["stages"].get(stage)
+        if h is None:
+            continue
+        if h["wall_seconds"] > b["wall_seconds"] * (1 + wall_tolerance):
+            regressions.append(f"{stage}: wall {b['wall_seconds']:.3f}s -> {h['wall_seconds']:.3f}s")
+        if h["requests"] > b["requests"]:
+            regressions.append(f"{stage}: requests {b['requests']} -> {h['requests']}")
+        if h["bytes_received"] > b["bytes_received"]:
+            regressions.append(f"{stage}: bytes received {b['bytes_received']} -> {h['bytes_received']}")
+        if h["peak_rss_kb"] > b["peak_rss_kb"] * (1 + rss_tolerance):
+            regressions.append(f"{stage}: peak RSS {b['peak_rss_kb']}KB -> {h['peak_rss_kb']}KB")
+    return regressions
+
+def cmd_compare(args):
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+    print(f"{base['commit']} -> {head['commit']}")
+    for stage, b in base["stages"].items():
+        h = head["stages"].get(stage)
+        if h:
+            change = (h["wall_seconds"] - b["wall_seconds"]) / b["wall_seconds"] * 100 if b["wall_seconds"] else 0.0
+            print(f"  {stage:<8} {b['wall_seconds']:.3f}s -> {h['wall_seconds']:.3f}s ({change:+.1f}%)")
+    regressions = compare_reports(base, head, args.wall_tolerance, args.rss_tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    sys.exit(1 if regressions else 0)
+
+def main():
+    if len(sys.argv) == 5 and sys.argv[1] == "_stage":
+        run_stage_child(*sys.argv[2:])
+        return
+
+    parser = argparse.ArgumentParser(description="Benchmark the fetch/render/send pipeline.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    record = sub.add_parser("record", help="Capture live parliament API responses to fixtures.")
+    record.add_argument("--fixtures", default="fixtures/http")
+    record.add_argument("--mapping", default=os.path.join(REPO_ROOT, "mapping.csv"))
+    record.set_defaults(func=cmd_record)
+
+    run = sub.add_parser("run", help="Benchmark the pipeline against recorded fixtures.")
+    run.add_argument("--fixtures", default="fixtures/http")
+    run.add_argument("--mapping", default=os.path.join(REPO_ROOT, "mapping.csv"))
+    run.add_argument("--stages", help=f"Comma-separated subset of {','.join(STAGES)}.")
+    run.add_argument("--repeat", type=int, default=3)
+    run.add_argument("--output", help="Result file (default benchmarks/results/<commit>.json).")
+    run.set_defaults(func=cmd_run)
+
+    compare = sub.add_parser("compare", help="Compare two result files; exit 1 on regression.")
+    compare.add_argument("base")
+    compare.add_argument("head")
+    compare.add_argument("--wall-tolerance", type=float, default=DEFAULT_WALL_TOLERANCE)
+    compare.add_argument("--rss-tolerance", type=float, default=DEFAULT_RSS_TOLERANCE)
+    compare.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
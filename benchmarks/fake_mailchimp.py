@@ -0,0 +1,452 @@
+"""
+Local stand-in for the parts of the MailChimp Marketing API that the helpers
+use, so the send path can be exercised and load-tested without touching the
+real account.
+
+Covers campaigns (list/create/get/patch/content/send/replicate), interest
+categories and interests, campaign folders, segments, tag-search and
+batches. Latency, error rate and 429 throttling are configurable; the server
+keeps counters that a harness can read back after a run.
+
+Run standalone:
+    python benchmarks/fake_mailchimp.py --port 8099 --latency 0.05
+then point the helpers at it:
+    MAILCHIMP_BASE_URL=http://127.0.0.1:8099/3.0
+"""
+import argparse
+import itertools
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+API_PREFIX = "/3.0"
+DEFAULT_PAGE_SIZE = 10
+MAX_CONCURRENT_CONNECTIONS = 10  # MailChimp's documented per-user limit
+
+class FakeMailChimpConfig:
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0,
+                 max_concurrent=MAX_CONCURRENT_CONNECTIONS, max_rps=None,
+                 retry_after=1, seed=None):
+        self.latency = latency            # base seconds added to every response
+        self.jitter = jitter              # +/- uniform seconds on top of latency
+        self.error_rate = error_rate      # probability of a 500 on any request
+        self.max_concurrent = max_concurrent  # in-flight requests before 429; None disables
+        self.max_rps = max_rps            # requests per rolling second before 429; None disables
+        self.retry_after = retry_after    # Retry-After header sent with 429s
+        self.random = random.Random(seed)
+
+class FakeMailChimpState:
+    """In-memory account data plus request statistics."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.campaigns = {}
+        self.categories = {}   # list_id -> {category_id: category}
+        self.interests = {}    # category_id -> {interest_id: interest}
+        self.folders = {}
+        self.segments = {}     # list_id -> [segment]
+        self.tags = {}         # list_id -> [tag]
+        self.batches = {}
+        # statistics
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.request_count = 0
+        self.endpoint_counts = {}
+        self.status_counts = {}
+        self.latencies = []
+        self.recent_starts = []
+
+    def new_id(self, prefix=""):
+        return f"{prefix}{next(self._ids):06x}{uuid.uuid4().hex[:4]}"
+
+    def add_category(self, list_id, title, category_id=None):
+        category_id = category_id or self.new_id("cat")
+        self.categories.setdefault(list_id, {})[category_id] = {
+            "list_id": list_id, "id": category_id, "title": title, "type": "checkboxes",
+        }
+        self.interests.setdefault(category_id, {})
+        return category_id
+
+    def add_interest(self, list_id, category_id, name, subscriber_count=0, interest_id=None):
+        interest_id = interest_id or self.new_id("int")
+        self.interests.setdefault(category_id, {})[interest_id] = {
+            "category_id": category_id, "list_id": list_id, "id": interest_id,
+            "name": name, "subscriber_count": str(subscriber_count),
+            "display_order": len(self.interests[category_id]),
+        }
+        return interest_id
+
+    def stats(self):
+        with self.lock:
+            latencies = sorted(self.latencies)
+            def pct(p):
+                return latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies else 0.0
+            return {
+                "requests": self.request_count,
+                "peak_in_flight": self.peak_in_flight,
+                "status_counts": dict(self.status_counts),
+                "endpoint_counts": dict(self.endpoint_counts),
+                "latency_p50": pct(0.50),
+                "latency_p95": pct(0.95),
+                "campaigns": len(self.campaigns),
+                "campaigns_sent": sum(1 for c in self.campaigns.values() if c["status"] == "sent"),
+            }
+
+class ApiError(Exception):
+    def __init__(self, status, title, detail=""):
+        super().__init__(detail)
+        self.status = status
+        self.title = title
+        self.detail = detail
+
+def _paginate(items, key, query):
+    count = int(query.get("count", [DEFAULT_PAGE_SIZE])[0])
+    offset = int(query.get("offset", [0])[0])
+    return {key: items[offset:offset + count], "total_items": len(items)}
+
+# (method, regex, handler name); the first match wins
+ROUTES = [
+    ("GET", r"/campaigns", "list_campaigns"),
+    ("POST", r"/campaigns", "create_campaign"),
+    ("GET", r"/campaigns/(?P<campaign_id>[^/]+)", "get_campaign"),
+    ("PATCH", r"/campaigns/(?P<campaign_id>[^/]+)", "patch_campaign"),
+    ("PUT", r"/campaigns/(?P<campaign_id>[^/]+)/content", "set_content"),
+    ("GET", r"/campaigns/(?P<campaign_id>[^/]+)/content", "get_content"),
+    ("POST", r"/campaigns/(?P<campaign_id>[^/]+)/actions/send", "send_campaign"),
+    ("POST", r"/campaigns/(?P<campaign_id>[^/]+)/actions/replicate", "replicate_campaign"),
+    ("GET", r"/campaign-folders", "list_folders"),
+    ("GET", r"/lists/(?P<list_id>[^/]+)/interest-categories", "list_categories"),
+    ("GET", r"/lists/(?P<list_id>[^/]+)/interest-categories/(?P<category_id>[^/]+)/interests", "list_interests"),
+    ("POST", r"/lists/(?P<list_id>[^/]+)/interest-categories/(?P<category_id>[^/]+)/interests", "create_interest"),
+    ("GET", r"/lists/(?P<list_id>[^/]+)/interest-categories/(?P<category_id>[^/]+)/interests/(?P<interest_id>[^/]+)", "get_interest"),
+    ("GET", r"/lists/(?P<list_id>[^/]+)/segments", "list_segments"),
+    ("GET", r"/lists/(?P<list_id>[^/]+)/tag-search", "tag_search"),
+    ("POST", r"/batches", "create_batch"),
+    ("GET", r"/batches/(?P<batch_id>[^/]+)", "get_batch"),
+    ("GET", r"/batch-results/(?P<batch_id>[^/]+)", "get_batch_results"),
+]
+COMPILED_ROUTES = [(m, re.compile(f"^{p}/?$"), h) for m, p, h in ROUTES]
+
+class FakeMailChimpApi:
+    """Endpoint implementations; each returns (status, body) or raises ApiError."""
+
+    def __init__(self, state: FakeMailChimpState):
+        self.state = state
+
+    def resolve(self, method, path):
+        """Returns (endpoint name, bound handler, path params) or raises a 404."""
+        for route_method, pattern, handler in COMPILED_ROUTES:
+            match = pattern.match(path)
+            if match and route_method == method:
+                return route_name(handler), getattr(self, handler), match.groupdict()
+        raise ApiError(404, "Resource Not Found", f"No fake route for {method} {path}")
+
+    def dispatch(self, method, path, query, body):
+        _, handler, params = self.resolve(method, path)
+        return handler(query=query, body=body, **params)
+
+    # --- campaigns ---
+
+    def _campaign(self, campaign_id):
+        campaign = self.state.campaigns.get(campaign_id)
+        if campaign is None:
+            raise ApiError(404, "Resource Not Found", f"Campaign {campaign_id} not found")
+        return campaign
+
+    def list_campaigns(self, query, body):
+        return 200, _paginate(list(self.state.campaigns.values()), "campaigns", query)
+
+    def create_campaign(self, query, body):
+        if not body or body.get("type") not in ("regular", "plaintext", "rss", "variate"):
+            raise ApiError(400, "Invalid Resource", "Campaign type is required")
+        campaign_id = self.state.new_id("cmp")
+        campaign = {
+            "id": campaign_id,
+            "type": body["type"],
+            "status": "save",
+            "create_time": time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime()),
+            "recipients": body.get("recipients", {}),
+            "settings": body.get("settings", {}),
+            "content": None,
+        }
+        with self.state.lock:
+            self.state.campaigns[campaign_id] = campaign
+        return 200, campaign
+
+    def get_campaign(self, query, body, campaign_id):
+        return 200, self._campaign(campaign_id)
+
+    def patch_campaign(self, query, body, campaign_id):
+        campaign = self._campaign(campaign_id)
+        for key in ("recipients", "settings"):
+            if body and key in body:
+                campaign[key] = body[key]
+        return 200, campaign
+
+    def set_content(self, query, body, campaign_id):
+        campaign = self._campaign(campaign_id)
+        if campaign["status"] != "save":
+            raise ApiError(400, "Invalid Resource", "Cannot edit a sent campaign")
+        campaign["content"] = (body or {}).get("html")
+        return 200, {"html": campaign["content"]}
+
+    def get_content(self, query, body, campaign_id):
+        return 200, {"html": self._campaign(campaign_id)["content"]}
+
+    def send_campaign(self, query, body, campaign_id):
+        campaign = self._campaign(campaign_id)
+        if campaign["status"] != "save":
+            raise ApiError(400, "Bad Request", "This campaign has already been sent")
+        if not campaign["content"]:
+            raise ApiError(400, "Bad Request", "Campaign has no content")
+        campaign["status"] = "sent"
+        return 204, None
+
+    def replicate_campaign(self, query, body, campaign_id):
+        source = self._campaign(campaign_id)
+        replica_id = self.state.new_id("cmp")
+        replica = dict(source, id=replica_id, status="save")
+        with self.state.lock:
+            self.state.campaigns[replica_id] = replica
+        return 200, replica
+
+    def list_folders(self, query, body):
+        return 200, _paginate(list(self.state.folders.values()), "folders", query)
+
+    # --- lists ---
+
+    def list_categories(self, query, body, list_id):
+        return 200, _paginate(list(self.state.categories.get(list_id, {}).values()), "categories", query)
+
+    def _interests(self, list_id, category_id):
+        if category_id not in self.state.categories.get(list_id, {}):
+            raise ApiError(404, "Resource Not Found", f"Interest category {category_id} not found")
+        return self.state.interests[category_id]
+
+    def list_interests(self, query, body, list_id, category_id):
+        return 200, _paginate(list(self._interests(list_id, category_id).values()), "interests", query)
+
+    def create_interest(self, query, body, list_id, category_id):
+        interests = self._interests(list_id, category_id)
+        name = (body or {}).get("name")
+        if not name:
+            raise ApiError(400, "Invalid Resource", "Interest name is required")
+        with self.state.lock:
+            if any(i["name"] == name for i in interests.values()):
+                raise ApiError(400, "Invalid Resource", f"Cannot add \"{name}\" because it already exists on the list.")
+            interest_id = self.state.add_interest(list_id, category_id, name)
+        return 200, interests[interest_id]
+
+    def get_interest(self, query, body, list_id, category_id, interest_id):
+        interest = self._interests(list_id, category_id).get(interest_id)
+        if interest is None:
+            raise ApiError(404, "Resource Not Found", f"Interest {interest_id} not found")
+        return 200, interest
+
+    def list_segments(self, query, body, list_id):
+        return 200, _paginate(self.state.segments.get(list_id, []), "segments", query)
+
+    def tag_search(self, query, body, list_id):
+        tags = self.state.tags.get(list_id, [])
+        name = query.get("name", [None])[0]
+        if name:
+            tags = [t for t in tags if name.lower() in t["name"].lower()]
+        return 200, _paginate(tags, "tags", query)
+
+    # --- batches ---
+
+    def create_batch(self, query, body):
+        operations = (body or {}).get("operations", [])
+        batch_id = self.state.new_id("bat")
+        results = []
+        for op in operations:
+            op_path = op.get("path", "")
+            op_body = json.loads(op["body"]) if isinstance(op.get("body"), str) else op.get("body")
+            try:
+                status, response = self.dispatch(op.get("method", "GET").upper(), op_path, {}, op_body)
+            except ApiError as e:
+                status, response = e.status, {"title": e.title, "detail": e.detail, "status": e.status}
+            results.append({"status_code": status, "operation_id": op.get("operation_id"),
+                            "response": json.dumps(response)})
+        batch = {
+            "id": batch_id,
+            "status": "finished",
+            "total_operations": len(operations),
+            "finished_operations": len(operations),
+            "errored_operations": sum(1 for r in results if r["status_code"] >= 400),
+            "response_body_url": f"{API_PREFIX}/batch-results/{batch_id}",
+        }
+        with self.state.lock:
+            self.state.batches[batch_id] = (batch, results)
+        return 200, batch
+
+    def get_batch(self, query, body, batch_id):
+        if batch_id not in self.state.batches:
+            raise ApiError(404, "Resource Not Found", f"Batch {batch_id} not found")
+        return 200, self.state.batches[batch_id][0]
+
+    def get_batch_results(self, query, body, batch_id):
+        if batch_id not in self.state.batches:
+            raise ApiError(404, "Resource Not Found", f"Batch {batch_id} not found")
+        return 200, self.state.batches[batch_id][1]
+
+def route_name(handler):
+    return handler.replace("_", "-")
+
+def make_handler(api: FakeMailChimpApi, config: FakeMailChimpConfig):
+    state = api.state
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body go out as separate writes on a keep-alive
+        # connection; with Nagle on, delayed ACKs add ~40 ms to every request
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass  # keep load-test output readable
+
+        def _reply(self, status, body, extra_headers=None):
+            payload = b"" if body is None else json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json" if status < 400 else "application/problem+json")
+            self.send_header("Content-Length", str(len(payload)))
+            for key, value in (extra_headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _throttled(self, now):
+            with state.lock:
+                state.in_flight += 1
+                state.peak_in_flight = max(state.peak_in_flight, state.in_flight)
+                state.request_count += 1
+                if config.max_rps:
+                    state.recent_starts = [t for t in state.recent_starts if now - t < 1.0]
+                    state.recent_starts.append(now)
+                    if len(state.recent_starts) > config.max_rps:
+                        return True
+                return config.max_concurrent is not None and state.in_flight > config.max_concurrent
+
+        def _handle(self, method):
+            started = time.perf_counter()
+            parsed = urlparse(self.path)
+            path = parsed.path[len(API_PREFIX):] if parsed.path.startswith(API_PREFIX) else parsed.path
+            query = parse_qs(parsed.query)
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            endpoint = "unrouted"
+            try:
+                if self._throttled(time.monotonic()):
+                    raise ApiError(429, "Too Many Requests", "You have exceeded the limit of 10 simultaneous connections.")
+                if not self.headers.get("Authorization", "").startswith("Basic "):
+                    raise ApiError(401, "API Key Missing", "Your request did not include an API key.")
+                delay = config.latency + config.random.uniform(-config.jitter, config.jitter)
+                if delay > 0:
+                    time.sleep(delay)
+                if config.random.random() < config.error_rate:
+                    raise ApiError(500, "Internal Server Error", "Injected failure")
+                body = json.loads(raw) if raw else None
+                endpoint, handler, params = api.resolve(method, path.rstrip("/") or "/")
+                status, response = handler(query=query, body=body, **params)
+                self._reply(status, response)
+            except ApiError as e:
+                headers = {"Retry-After": str(config.retry_after)} if e.status == 429 else None
+                status = e.status
+                self._reply(status, {"type": "https://mailchimp.com/developer/marketing/docs/errors/",
+                                     "title": e.title, "status": status, "detail": e.detail}, headers)
+            except Exception as e:
+                status = 500
+                self._reply(status, {"title": "Internal Server Error", "status": status, "detail": repr(e)})
+            finally:
+                elapsed = time.perf_counter() - started
+                with state.lock:
+                    state.in_flight -= 1
+                    state.latencies.append(elapsed)
+                    state.endpoint_counts[f"{method} {endpoint}"] = state.endpoint_counts.get(f"{method} {endpoint}", 0) + 1
+            with state.lock:
+                state.status_counts[status] = state.status_counts.get(status, 0) + 1
+
+        def do_GET(self):
+            self._handle("GET")
+
+        def do_POST(self):
+            self._handle("POST")
+
+        def do_PUT(self):
+            self._handle("PUT")
+
+        def do_PATCH(self):
+            self._handle("PATCH")
+
+    return Handler
+
+class FakeMailChimpServer:
+    """
+    Runs the fake API on a background thread.
+
+        with FakeMailChimpServer(config) as server:
+            os.environ['MAILCHIMP_BASE_URL'] = server.base_url
+    """
+
+    def __init__(self, config: FakeMailChimpConfig = None, host="127.0.0.1", port=0):
+        self.config = config or FakeMailChimpConfig()
+        self.state = FakeMailChimpState()
+        self.api = FakeMailChimpApi(self.state)
+        self.httpd = ThreadingHTTPServer((host, port), make_handler(self.api, self.config))
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}{API_PREFIX}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake MailChimp API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.0, help="Base response latency in seconds.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform +/- jitter in seconds.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of an injected 500.")
+    parser.add_argument("--max-concurrent", type=int, default=MAX_CONCURRENT_CONNECTIONS,
+                        help="In-flight requests allowed before 429 (0 disables).")
+    parser.add_argument("--max-rps", type=int, default=0, help="Requests per second before 429 (0 disables).")
+    parser.add_argument("--audience-id", default="fakeaudience")
+    parser.add_argument("--group-id", default="2012540f09")
+    args = parser.parse_args()
+
+    config = FakeMailChimpConfig(args.latency, args.jitter, args.error_rate,
+                                 args.max_concurrent or None, args.max_rps or None)
+    server = FakeMailChimpServer(config, args.host, args.port)
+    server.state.add_category(args.audience_id, "Committees", category_id=args.group_id)
+    print(f"Fake MailChimp listening on {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.state.stats(), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Pushes a simulated weekly send through sendUpdates against the local fake
+MailChimp server and reports throughput.
+
+    python benchmarks/loadtest_send.py --committees 500 --latency 0.08
+    python benchmarks/loadtest_send.py --committees 500 --workers 12 --max-concurrent 10
+
+With --workers 1 (the default) the run goes through sendUpdates.main()
+exactly as the weekly job does. With more workers the same per-committee
+send path (create_and_send_weekly_email) is driven from a thread pool, which
+shows where MailChimp's connection limit starts returning 429s.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_mailchimp import FakeMailChimpConfig, FakeMailChimpServer
+
+FAKE_AUDIENCE_ID = "fakeaudience"
+FAKE_GROUP_ID = "2012540f09"  # must match helpersMailChimp.GROUP_ID
+
+def build_workspace(server, workdir, committees, html_kb, empty_rate, seed_random):
+    """Seeds the fake account and writes mapping.csv plus one HTML page per committee."""
+    server.state.add_category(FAKE_AUDIENCE_ID, "Committees", category_id=FAKE_GROUP_ID)
+    htmls_dir = os.path.join(workdir, "docs", "HTMLs")
+    os.makedirs(htmls_dir, exist_ok=True)
+    filler = "<p>" + ("Lorem ipsum dolor sit amet. " * 36) + "</p>\n"
+    body = "<html><body>" + filler * max(1, html_kb) + "</body></html>"
+
+    with open(os.path.join(workdir, "mapping.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["cttee_id", "cttee_name", "interest_id"])
+        for n in range(1, committees + 1):
+            name = f"Synthetic Committee {n}"
+            subscribers = 0 if seed_random.random() < empty_rate else seed_random.randint(1, 400)
+            interest_id = server.state.add_interest(FAKE_AUDIENCE_ID, FAKE_GROUP_ID, name, subscribers)
+            writer.writerow([n, name, interest_id])
+            with open(os.path.join(htmls_dir, f"{n}.html"), "w", encoding="utf-8") as hf:
+                hf.write(body.replace("<body>", f"<body><h1>{name}</h1>", 1))
+
+    # sendUpdates only sends the pages the render step listed
+    pages = [{"id": str(n), "name": f"Synthetic Committee {n}", "filename": f"{n}.html"}
+             for n in range(1, committees + 1)]
+    with open(os.path.join(workdir, "rendered_pages.json"), "w", encoding="utf-8") as f:
+        json.dump({"pages": pages}, f)
+
+def run_sequential():
+    import sendUpdates
+    sendUpdates.main()
+
+def run_threaded(workers):
+    import helpersMailChimp
+    from helpersCSVMapping import get_registry
+    from helpersSendLedger import SendLedger
+
+    ledger = SendLedger()
+    rows = list(get_registry())
+
+    def send_one(row):
+        cttee_id, cttee_name, interest_id = row
+        with open(os.path.join("docs", "HTMLs", f"{cttee_id}.html"), encoding="utf-8") as hf:
+            html_body = hf.read()
+        return helpersMailChimp.create_and_send_weekly_email(
+            interest_id, f"{cttee_name} load test", html_body,
+            ledger=ledger, ledger_key=SendLedger.make_key(cttee_id, html_body),
+        )
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(send_one, rows))
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the MailChimp send path offline.")
+    parser.add_argument("--committees", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake server base latency (s).")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--max-concurrent", type=int, default=10, help="0 disables the 429 connection limit.")
+    parser.add_argument("--max-rps", type=int, default=0, help="0 disables the requests-per-second limit.")
+    parser.add_argument("--html-kb", type=int, default=20, help="Approximate size of each email body.")
+    parser.add_argument("--empty-rate", type=float, default=0.1, help="Share of interests with no subscribers.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON only.")
+    args = parser.parse_args()
+
+    config = FakeMailChimpConfig(args.latency, args.jitter, args.error_rate,
+                                 args.max_concurrent or None, args.max_rps or None, seed=args.seed)
+    original_cwd = os.getcwd()
+    with FakeMailChimpServer(config) as server, tempfile.TemporaryDirectory() as workdir:
+        build_workspace(server, workdir, args.committees, args.html_kb, args.empty_rate, config.random)
+        os.environ.update({
+            "API_KEY": "fake-key",
+            "DATA_CENTRE": "fake",
+            "AUDIENCE_ID": FAKE_AUDIENCE_ID,
+            "MAILCHIMP_BASE_URL": server.base_url,
+        })
+        os.chdir(workdir)
+        import helpersMailChimp
+        outcome = "completed"
+        started = time.perf_counter()
+        try:
+            if args.workers > 1:
+                run_threaded(args.workers)
+            else:
+                run_sequential()
+        except helpersMailChimp.MailChimpError:
+            # The threaded path stops at the first non-retryable error
+            outcome = "aborted"
+        finally:
+            elapsed = time.perf_counter() - started
+            os.chdir(original_cwd)
+        stats = server.state.stats()
+
+    report = {
+        "committees": args.committees,
+        "workers": args.workers,
+        "outcome": outcome,
+        "wall_seconds": round(elapsed, 3),
+        "campaigns_per_second": round(stats["campaigns_sent"] / elapsed, 2) if elapsed else None,
+        "requests_per_second": round(stats["requests"] / elapsed, 2) if elapsed else None,
+        **stats,
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"\n{report['outcome']}: {stats['campaigns_sent']}/{args.committees} campaigns sent "
+          f"in {report['wall_seconds']}s with {args.workers} worker(s)")
+    print(f"  {report['campaigns_per_second']} campaigns/s, {report['requests_per_second']} requests/s, "
+          f"peak in-flight {stats['peak_in_flight']}")
+    print(f"  server latency p50 {stats['latency_p50']:.3f}s p95 {stats['latency_p95']:.3f}s")
+    print(f"  statuses {stats['status_counts']}")
+
+if __name__ == "__main__":
+    main()
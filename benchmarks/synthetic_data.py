@@ -0,0 +1,217 @@
+"""
+Generates synthetic parliament_data.json and mapping.csv files at any scale,
+shaped like the real API output, for scaling tests of generate_htmls.
+
+    python benchmarks/synthetic_data.py --committees 300 --days 30 --out /tmp/synthetic
+
+Item counts are given per committee per week. Events can belong to several
+committees and carry several activities (oral evidence with
+committeeBusinesses and attendees, plus private sessions); publications and
+news are spread across committees over the date window. Output is
+deterministic for a given seed.
+"""
+import argparse
+import csv
+import json
+import os
+import random
+from datetime import datetime, timedelta, timezone
+
+ORGANISATIONS = [
+    "Department for Education", "HM Treasury", "Ofwat", "NHS England", "Ofcom",
+    "Bank of England", "National Audit Office", "Environment Agency",
+    "University of Leeds", "Citizens Advice", "Confederation of British Industry",
+]
+ROLES = ["Chief Executive", "Permanent Secretary", "Director", "Professor", "Policy Lead", "Chair"]
+FIRST_NAMES = ["Alex", "Sam", "Priya", "Tom", "Aisha", "Chris", "Helen", "Jamal", "Rosa", "Iain"]
+LAST_NAMES = ["Smith", "Patel", "Jones", "Okafor", "Brown", "Nguyen", "Evans", "Kaur", "Hill", "King"]
+TOPICS = ["water quality", "school funding", "energy prices", "digital markets", "defence procurement",
+          "rural broadband", "housing supply", "NHS waiting lists", "trade agreements", "AI regulation"]
+PUBLICATION_TYPES = [(1, "Report"), (12, "Special Report")]
+
+def _committee(cttee_id, name):
+    return {
+        "contact": {"email": f"committee{cttee_id}@parliament.uk", "phone": None, "address": None,
+                    "contactDisclaimer": None},
+        "id": cttee_id,
+        "name": name,
+        "parentCommittee": None,
+        "subCommittees": [],
+        "house": "Commons",
+        "leadHouse": None,
+        "category": {"id": 1, "name": "Select"},
+        "committeeTypes": [{"id": 1, "name": "(HC) Public Standing Orders - Departmental",
+                            "committeeCategory": {"id": 1, "name": "Select"}}],
+        "showOnWebsite": True,
+        "isLeadCommittee": None,
+    }
+
+def _attendee(rng, attendee_id, order):
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    roll = rng.random()
+    if roll < 0.75:
+        organisations = [{"name": rng.choice(ORGANISATIONS), "role": rng.choice(ROLES),
+                          "idmsId": None, "cisId": rng.randint(1, 40000)}]
+        context = None
+    elif roll < 0.9:
+        organisations, context = [], "Member of the public"
+    else:
+        organisations, context = [], None
+    return {
+        "displayOrder": order, "organisations": organisations, "submitterType": 0,
+        "additionalContext": context, "id": attendee_id, "personId": attendee_id + 100000,
+        "name": name, "photoUrl": None, "memberInfo": None,
+    }
+
+def _business(rng, business_id, committee):
+    topic = rng.choice(TOPICS)
+    return {
+        "id": business_id,
+        "title": f"Inquiry into {topic}",
+        "type": {"id": 1, "name": "Inquiry", "isInquiry": True, "description": ""},
+        "openDate": "2025-01-01T00:00:00", "closeDate": None, "latestReport": None,
+        "openSubmissionPeriods": [], "closedSubmissionPeriods": [], "nextOralEvidenceSession": None,
+        "contact": committee["contact"],
+    }
+
+def generate_dataset(committees=22, events_per_committee=1.2, activities_per_event=3,
+                     attendees_per_activity=4, publications_per_committee=0.2,
+                     news_per_committee=0.5, days=6, joint_event_rate=0.1, seed=1,
+                     end=None):
+    """
+    Returns (data, mapping_rows). data matches parliament_data.json; mapping
+    rows are (cttee_id, cttee_name, interest_id). Per-committee rates are per
+    week and scale with the length of the window.
+    """
+    rng = random.Random(seed)
+    end = end or datetime(2026, 3, 3, 17, 0, tzinfo=timezone.utc)
+    start = end - timedelta(days=days)
+    ids = iter(range(10000, 10**9))
+    weeks = days / 7
+
+    cttees = [_committee(1000 + n, f"Synthetic Committee {n}") for n in range(committees)]
+    mapping_rows = [(c["id"], c["name"], f"{rng.getrandbits(40):010x}") for c in cttees]
+
+    def random_time():
+        return start + timedelta(seconds=rng.randint(0, days * 86400))
+
+    events = []
+    for _ in range(round(committees * events_per_committee * weeks)):
+        owners = [rng.choice(cttees)]
+        if rng.random() < joint_event_rate:
+            owners.append(rng.choice(cttees))
+        event_start = random_time().replace(minute=0, second=0, tzinfo=None)
+        event_id = next(ids)
+        activities = []
+        for a in range(activities_per_event):
+            activity_start = event_start + timedelta(minutes=30 * a)
+            oral = a > 0 or rng.random() < 0.5
+            activities.append({
+                "committeeBusinesses": [_business(rng, next(ids), owners[0])] if oral else [],
+                "oralEvidences": [],
+                "id": next(ids),
+                "name": owners[0]["name"],
+                "startDate": activity_start.isoformat(),
+                "endDate": (activity_start + timedelta(minutes=30)).isoformat(),
+                "eventId": event_id,
+                "isPrivate": not oral,
+                "activityType": "Oral evidence" if oral else "Private discussion",
+                "attendees": [_attendee(rng, next(ids), o + 1) for o in range(attendees_per_activity)] if oral else [],
+            })
+        events.append({
+            "id": event_id,
+            "name": owners[0]["name"],
+            "startDate": event_start.isoformat(),
+            "endDate": (event_start + timedelta(minutes=30 * activities_per_event)).isoformat(),
+            "cancelledDate": None,
+            "locationId": 13,
+            "location": "Room 6, Palace of Westminster",
+            "eventType": {"id": 6, "name": "Formal meeting (oral evidence session)", "isVisit": False,
+                          "description": ""},
+            "eventSource": "CIS",
+            "committees": owners,
+            "committeeBusinesses": [b for act in activities for b in act["committeeBusinesses"]],
+            "childEvents": [],
+            "nextActivity": None,
+            "activities": activities,
+        })
+
+    publications = []
+    for _ in range(round(committees * publications_per_committee * weeks)):
+        committee = rng.choice(cttees)
+        type_id, type_name = rng.choice(PUBLICATION_TYPES)
+        pub_id = next(ids)
+        publications.append({
+            "businesses": [], "committee": committee,
+            "description": f"{rng.choice(TOPICS).capitalize()}: {type_name.lower()}",
+            "id": pub_id,
+            "publicationStartDate": random_time().replace(tzinfo=None).isoformat(),
+            "governmentResponses": [], "publicationEndDate": None, "documents": [],
+            "hcNumber": str(rng.randint(100, 999)), "hlPaper": None,
+            "type": {"id": type_id, "name": type_name},
+            "responseToPublicationId": None,
+            "additionalContentUrl": f"https://committees.parliament.uk/publications/{pub_id}/",
+            "additionalContentUrl2": None, "respondingDepartment": None,
+        })
+
+    news = []
+    for _ in range(round(committees * news_per_committee * weeks)):
+        committee = rng.choice(cttees)
+        topic = rng.choice(TOPICS)
+        news_id = next(ids)
+        news.append({
+            "heading": f"Committee launches work on {topic}",
+            "teaser": f"The {committee['name']} has published new material on {topic}. " * 2,
+            "intro": None, "body": None,
+            "datePublished": random_time().isoformat(),
+            "imageUrl": f"https://www.parliament.uk/contentassets/{news_id}/image.jpeg",
+            "imageAltText": "",
+            "thumbnailUrl": None,
+            "url": f"/external/committees/news/synthetic/{news_id}/",
+            "id": news_id,
+            "source_committee_id": committee["id"],
+        })
+
+    data = {
+        "metadata": {"extracted_at": end.isoformat(),
+                     "range": [start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')]},
+        "events": events,
+        "publications": publications,
+        "news": news,
+    }
+    return data, mapping_rows
+
+def write_dataset(out_dir, data, mapping_rows):
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, "parliament_data.json"), "w") as f:
+        json.dump(data, f, indent=4)
+    with open(os.path.join(out_dir, "mapping.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["cttee_id", "cttee_name", "interest_id"])
+        writer.writerows(mapping_rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic parliament dataset.")
+    parser.add_argument("--committees", type=int, default=300)
+    parser.add_argument("--events-per-committee", type=float, default=1.2)
+    parser.add_argument("--activities-per-event", type=int, default=3)
+    parser.add_argument("--attendees-per-activity", type=int, default=4)
+    parser.add_argument("--publications-per-committee", type=float, default=0.2)
+    parser.add_argument("--news-per-committee", type=float, default=0.5)
+    parser.add_argument("--days", type=int, default=6)
+    parser.add_argument("--joint-event-rate", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", required=True, help="Directory for parliament_data.json and mapping.csv.")
+    args = parser.parse_args()
+
+    data, rows = generate_dataset(
+        args.committees, args.events_per_committee, args.activities_per_event,
+        args.attendees_per_activity, args.publications_per_committee,
+        args.news_per_committee, args.days, args.joint_event_rate, args.seed,
+    )
+    write_dataset(args.out, data, rows)
+    print(f"Wrote {len(rows)} committees, {len(data['events'])} events, "
+          f"{len(data['publications'])} publications, {len(data['news'])} news items to {args.out}")
+
+if __name__ == "__main__":
+    main()
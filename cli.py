@@ -0,0 +1,97 @@
+"""
+Single entry point for the committee update scripts.
+
+    python cli.py list-committees --category Select
+    python cli.py add-committees --bulk
+    python cli.py add-committees --house Lords
+    python cli.py run --stages fetch,render --persist json,html
+    python cli.py list-campaigns
+
+Only the module behind the chosen subcommand is imported, so quick commands
+do not pay for lxml, requests or MailChimp configuration they never use.
+--profile DIR (before the subcommand) profiles whatever the subcommand runs.
+"""
+import argparse
+import importlib
+import logging
+import sys
+
+import helpersProfile
+
+def _list_committees(args):
+    helpersCtteesAPI = importlib.import_module("helpersCtteesAPI")
+    helpersCtteesAPI.list_committees(args.category, args.type, args.subs)
+
+def _add_committees(args):
+    importlib.import_module("addCttee").main(bulk=args.bulk, dry_run=args.dry_run, house=args.house)
+
+def _run_pipeline(args):
+    importlib.import_module("runPipeline").main(args.pipeline_args)
+
+def _watch(args):
+    importlib.import_module("watchPipeline").main(args.watch_args)
+
+def _module_main(module_name):
+    def run(args):
+        importlib.import_module(module_name).main()
+    return run
+
+def _mailchimp_listing(function_name):
+    def run(args):
+        getattr(importlib.import_module("helpersMailChimp"), function_name)()
+    return run
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="cli.py", description="Committee email update tools.")
+    parser.add_argument("--log-level", default="WARNING",
+                        choices=["DEBUG", "INFO", "WARNING", "ERROR"], help="Logging level (default WARNING).")
+    helpersProfile.add_profile_arguments(parser)
+    sub = parser.add_subparsers(dest="command", required=True, metavar="command")
+
+    p = sub.add_parser("list-committees", help="List committees from the local catalogue.")
+    p.add_argument("--category", choices=["Select", "General", "Other"])
+    p.add_argument("--type", action="append", help="Committee type name; repeat for several.")
+    p.add_argument("--subs", action="store_true", help="Include sub-committees.")
+    p.set_defaults(func=_list_committees)
+
+    p = sub.add_parser("add-committees", help="Create MailChimp interests for committees and map them.")
+    p.add_argument("--bulk", action="store_true")
+    p.add_argument("--dry-run", action="store_true")
+    p.add_argument("--house", choices=("Commons", "Lords", "Joint"), default="Commons")
+    p.set_defaults(func=_add_committees)
+
+    p = sub.add_parser("run", help="Run the pipeline in one process (see runPipeline.py --help).")
+    p.add_argument("pipeline_args", nargs=argparse.REMAINDER)
+    p.set_defaults(func=_run_pipeline)
+
+    p = sub.add_parser("watch", help="Poll for new items and send alerts (see watchPipeline.py --help).")
+    p.add_argument("watch_args", nargs=argparse.REMAINDER)
+    p.set_defaults(func=_watch)
+
+    for name, module_name, text in (
+        ("fetch", "fetch_parliament_data", "Fetch this week's data to parliament_data.json."),
+        ("render", "generate_htmls", "Render docs/HTMLs from parliament_data.json."),
+        ("send", "sendUpdates", "Send the rendered pages to MailChimp."),
+    ):
+        sub.add_parser(name, help=text).set_defaults(func=_module_main(module_name))
+
+    for name, function_name in (
+        ("list-campaigns", "list_all_campaigns"),
+        ("list-groups", "list_all_groups_and_interests"),
+        ("list-segments", "list_all_segments"),
+        ("list-tags", "list_all_tags"),
+        ("list-folders", "list_campaign_folders"),
+    ):
+        sub.add_parser(name, help=f"MailChimp: {function_name.replace('_', ' ')}.").set_defaults(
+            func=_mailchimp_listing(function_name))
+
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=getattr(logging, args.log_level))
+    with helpersProfile.stage(helpersProfile.profiler_from_args(args), args.command):
+        args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,33 +1,61 @@
 
 from datetime import datetime, timedelta, timezone
 import json
-import requests
+import os
 
 import helpersCSVMapping
+import helpersHTTP
+import helpersMetrics
 
-# 1. Setup Dates
-# Use timezone.utc to make these "offset-aware"
-today = datetime.now(timezone.utc)
-six_days_ago = today - timedelta(days=6)
+JSON_FILE = 'parliament_data.json'
 
-# Format for API: 'YYYY-MM-DD'
-START_DATE = six_days_ago.strftime('%Y-%m-%d')
-END_DATE = today.strftime('%Y-%m-%d')
+WINDOW_DAYS = 6
 
-def fetch_all_pages(base_url, params, date_field=None):
-    """Generic function to handle pagination via the 'Skip' parameter."""
+def date_window(as_of: datetime = None):
+    """
+    Returns (today, six_days_ago) for a run. Computed per call rather than at
+    import, so a long-lived process always gets the current window.
+
+    PIPELINE_AS_OF (ISO date or datetime) pins the window, e.g. when
+    replaying recorded fixtures. A value without an offset is taken as UTC.
+    """
+    if as_of is None:
+        if os.environ.get('PIPELINE_AS_OF'):
+            as_of = datetime.fromisoformat(os.environ['PIPELINE_AS_OF'])
+        else:
+            # Use timezone.utc to make these "offset-aware"
+            as_of = datetime.now(timezone.utc)
+    if as_of.tzinfo is None:
+        # The API's news dates carry an offset, and naive and aware times cannot be compared
+        as_of = as_of.replace(tzinfo=timezone.utc)
+    return as_of, as_of - timedelta(days=WINDOW_DAYS)
+
+def in_current_window(timestamp: str, as_of: datetime = None) -> bool:
+    """Whether an ISO date or datetime falls on a day of the current date_window()."""
+    today, six_days_ago = date_window(as_of)
+    return six_days_ago.date() <= datetime.fromisoformat(timestamp).date() <= today.date()
+
+def fetch_all_pages(base_url, params, date_field=None, since=None):
+    """
+    Generic function to handle pagination via the 'Skip' parameter.
+
+    With date_field set, items older than since are dropped and paging stops
+    at the first one, as the feed is newest first.
+    """
     all_items = []
     skip = 0
     page_size = 30
+    endpoint = helpersMetrics.endpoint_label(base_url)
     
     while True:
         current_params = params.copy()
         current_params['Skip'] = str(skip)
         
         print(f"Fetching: {base_url} with skip={skip}")
-        response = requests.get(base_url, params=current_params)
+        response = helpersHTTP.get(base_url, params=current_params)
         response.raise_for_status()
         data = response.json()
+        helpersMetrics.inc('fetch_pages_total', endpoint=endpoint)
         
         # Adjust based on specific API response structure
         # Most of these APIs return a list or an object containing 'items'
@@ -45,12 +73,14 @@ def fetch_all_pages(base_url, params, date_field=None):
                 item_value = item['value']
                 # Use fromisoformat and ensure it handles the 'Z' correctly as UTC
                 item_date = datetime.fromisoformat(item_value[date_field].replace('Z', '+00:00'))
-                if item_date >= six_days_ago:
+                if item_date >= since:
                     filtered_items.append(item_value)
                 else:
                     stop_pagination = True
             
             all_items.extend(filtered_items)
+            helpersMetrics.inc('fetch_items_total', len(filtered_items), endpoint=endpoint, outcome='kept')
+            helpersMetrics.inc('fetch_items_total', len(items) - len(filtered_items), endpoint=endpoint, outcome='filtered')
             if stop_pagination:
                 break
         else:
@@ -64,83 +94,188 @@ def fetch_all_pages(base_url, params, date_field=None):
         
     return all_items
 
-def main():
+EVENTS_URL = "https://committees-api.parliament.uk/api/Events"
+PUBLICATIONS_URL = "https://committees-api.parliament.uk/api/Publications"
+NEWS_URL = "https://www.parliament.uk/api/content/committee/{cttee_id}/news/"
 
-    # --- Step 0: Load Allowed Committee IDs ---
-    allowed_ids = set()
-    try:
-        allowed_ids = helpersCSVMapping.fetch_cttee_ids_from_mapping_CSV()
-    except FileNotFoundError:
-        print("Error: mapping.csv not found.")
+# Events are listed per house; a joint committee's events come back under each
+EVENT_HOUSES = {'Commons': ('Commons',), 'Lords': ('Lords',), 'Joint': ('Commons', 'Lords')}
 
-    # --- ENDPOINT 1: Events ---
-    events_url = "https://committees-api.parliament.uk/api/Events"
+def fetch_events(start_date: str, end_date: str, house: str = 'Commons') -> list:
+    """All of one house's events starting between the two dates ('YYYY-MM-DD'), unfiltered."""
     events_params = {
         'GroupChildEventsWithParent': 'false',
-        'StartDateFrom': START_DATE,
-        'StartDateTo': END_DATE,
+        'StartDateFrom': start_date,
+        'StartDateTo': end_date,
         'ExcludeCancelledEvents': 'true',
-        'House': 'Commons',
+        'House': house,
         'IncludeEventAttendees': 'true',
         'ShowOnWebsiteOnly': 'true'
     }
-    raw_events = fetch_all_pages(events_url, events_params)
+    return fetch_all_pages(EVENTS_URL, events_params)
+
+def fetch_publications(start_date: str, end_date: str) -> list:
+    """All reports and government responses published between the two dates, unfiltered."""
+    pubs_params = {
+        'PublicationTypeIds': [1, 12],
+        'StartDate': start_date,
+        'EndDate': end_date,
+        'SortOrder': 'PublicationDateDescending',
+        'ShowOnWebsiteOnly': 'true'
+    }
+    return fetch_all_pages(PUBLICATIONS_URL, pubs_params)
+
+def fetch_news(c_id, since: datetime) -> list:
+    """A committee's news items published since the given time, tagged with source_committee_id."""
+    print(f"Fetching news for Committee ID: {c_id}")
+    # Fetch and filter by date
+    committee_news = fetch_all_pages(NEWS_URL.format(cttee_id=c_id), {}, date_field='datePublished', since=since)
+
+    # Add the committee ID to each news item so you know where it came from
+    for item in committee_news:
+        item['source_committee_id'] = c_id
+    return committee_news
+
+def filter_events(events: list, allowed_ids) -> list:
+    """Keeps oral evidence sessions held by at least one of the committees."""
     # Filter: Keep event if ANY committee ID in the list matches our set
     events_data_part_raw = [
-        e for e in raw_events 
+        e for e in events
         if any(c.get('id') in allowed_ids for c in e.get('committees', []))
     ]
     events_data = [
         e for e in events_data_part_raw
         if any(a.get('activityType')=="Oral evidence" for a in e.get('activities',[]))
     ]
-    # --- ENDPOINT 2: Publications ---
-    pubs_url = "https://committees-api.parliament.uk/api/Publications"
-    pubs_params = {
-        'PublicationTypeIds': [1, 12],
-        'StartDate': START_DATE,
-        'EndDate': END_DATE,
-        'SortOrder': 'PublicationDateDescending',
-        'ShowOnWebsiteOnly': 'true'
-    }
-    raw_pubs = fetch_all_pages(pubs_url, pubs_params)
+    _count_kept(EVENTS_URL, len(events_data), len(events))
+    return events_data
+
+def filter_publications(publications: list, allowed_ids) -> list:
     # Filter: Keep publication if the committee ID matches our set
     pubs_data = [
-        p for p in raw_pubs 
+        p for p in publications
         if p.get('committee', {}).get('id') in allowed_ids
     ]
+    _count_kept(PUBLICATIONS_URL, len(pubs_data), len(publications))
+    return pubs_data
 
-    # --- ENDPOINT 3: Committee News ---
-    # Example Committee ID: 1 (You may need to loop a list of IDs if you have many)
-# --- ENDPOINT 3: Committee News (Looping via CSV) ---
-    all_news_data = []
+def _count_kept(url: str, kept: int, total: int) -> None:
+    endpoint = helpersMetrics.endpoint_label(url)
+    helpersMetrics.inc('fetch_items_total', kept, endpoint=endpoint, outcome='kept')
+    helpersMetrics.inc('fetch_items_total', total - kept, endpoint=endpoint, outcome='filtered')
+
+def event_houses(houses) -> list:
+    """The houses whose Events listings cover the committees of houses, in order."""
+    listed = []
+    for house in houses:
+        for event_house in EVENT_HOUSES[house]:
+            if event_house not in listed:
+                listed.append(event_house)
+    return listed
 
+def _unique_by_id(items) -> list:
+    """Drops repeats of an item id, keeping the first; joint committees' events are listed by both houses."""
+    seen = set()
+    unique = []
+    for item in items:
+        if item.get('id') not in seen:
+            seen.add(item.get('id'))
+            unique.append(item)
+    return unique
+
+def fetch_house_events(start_date: str, end_date: str, houses=('Commons',)) -> list:
+    """
+    The Events listings covering houses, fetched concurrently, one query per
+    listed house. An event listed by more than one house is kept once.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    listed = event_houses(houses)
+    with ThreadPoolExecutor(max_workers=len(listed)) as pool:
+        per_house = list(pool.map(lambda house: fetch_events(start_date, end_date, house), listed))
+    return _unique_by_id(item for items in per_house for item in items)
+
+def fetch_listings(as_of: datetime = None, houses=('Commons',)) -> dict:
+    """
+    Fetches this window's full Events and Publications listings, unfiltered.
+    These are the same for every committee, so a sharded run fetches them
+    once and hands them to each shard.
+
+    The Publications query (which already covers every house) runs
+    alongside each house's Events query.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    today, six_days_ago = date_window(as_of)
+
+    # Format for API: 'YYYY-MM-DD'
+    start_date = six_days_ago.strftime('%Y-%m-%d')
+    end_date = today.strftime('%Y-%m-%d')
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        pubs_future = pool.submit(fetch_publications, start_date, end_date)
+        events = fetch_house_events(start_date, end_date, houses)
+        publications = _unique_by_id(pubs_future.result())
+
+    return {
+        "metadata": {"extracted_at": today.isoformat(), "range": [start_date, end_date], "houses": list(houses)},
+        "events": events,
+        "publications": publications,
+    }
+
+def fetch_data(allowed_ids, as_of: datetime = None, listings: dict = None, houses=('Commons',)) -> dict:
+    """
+    Fetches this window's events, publications and news for the given
+    committee ids. Returns the dict that main() saves as JSON_FILE.
+
+    Pass listings (from fetch_listings) to reuse already-fetched Events and
+    Publications; the window is then taken from them. Otherwise they are
+    fetched for houses.
+    """
+    if listings is None:
+        listings = fetch_listings(as_of, houses)
+    else:
+        as_of = datetime.fromisoformat(listings["metadata"]["extracted_at"])
+    today, six_days_ago = date_window(as_of)
+    start_date, end_date = listings["metadata"]["range"]
+
+    events_data = filter_events(listings["events"], allowed_ids)
+    pubs_data = filter_publications(listings["publications"], allowed_ids)
+
+    # --- Committee News (one feed per committee) ---
+    all_news_data = []
     for c_id in allowed_ids:
-        c_id_string = str(c_id)
-        news_url = f"https://www.parliament.uk/api/content/committee/{c_id_string}/news/"
-        print(f"Fetching news for Committee ID: {c_id_string}")
-        
-        # Fetch and filter by date
-        committee_news = fetch_all_pages(news_url, {}, date_field='datePublished')
-        
-        # Optional: Add the committee ID to each news item so you know where it came from
-        for item in committee_news:
-            item['source_committee_id'] = c_id
-            
-        all_news_data.extend(committee_news)
+        all_news_data.extend(fetch_news(c_id, six_days_ago))
 
-    # Update the news key in your output dictionary
     output = {
-        "metadata": {"extracted_at": today.isoformat(), "range": [START_DATE, END_DATE]},
+        "metadata": {"extracted_at": today.isoformat(), "range": [start_date, end_date]},
         "events": events_data,
         "publications": pubs_data,
-        "news": all_news_data  # Changed from news_data to all_news_data
+        "news": all_news_data
     }
 
-    with open('parliament_data.json', 'w') as f:
+    return output
+
+def save_data(output: dict, filepath: str = JSON_FILE) -> None:
+    with open(filepath, 'w') as f:
         json.dump(output, f, indent=4)
     
-    print(f"Successfully saved {len(events_data)} events, {len(pubs_data)} publications, and {len(all_news_data)} news items.")
+    print(f"Successfully saved {len(output['events'])} events, {len(output['publications'])} publications, and {len(output['news'])} news items.")
+
+def load_allowed_ids(registry=None) -> set:
+    registry = registry or helpersCSVMapping.get_pipeline_registry()
+    if not registry.exists:
+        print(f"Error: {registry.filepath} not found.")
+    return registry.cttee_ids()
+
+def main():
+
+    # --- Step 0: Load Allowed Committee IDs, for every house with a mapping ---
+    registry = helpersCSVMapping.get_pipeline_registry()
+    allowed_ids = load_allowed_ids(registry)
+
+    save_data(fetch_data(allowed_ids, houses=registry.houses))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import helpersProfile
+    helpersProfile.run_main(main, "fetch", "Fetch this week's committee data to parliament_data.json.")
\ No newline at end of file
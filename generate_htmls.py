@@ -1,18 +1,26 @@
 import json
-import csv
-from datetime import datetime
+from datetime import datetime, timezone
 import os
+import time
+from urllib.parse import urljoin
 from lxml import html
 from lxml.html import builder as E
 
+import helpersCSVMapping
+import helpersFiles
+import helpersMetrics
+import helpersSeenStore
+
 # --- Setup ---
 JSON_FILE = 'parliament_data.json'
-MAPPING_FILE = 'mapping.csv'
 OUTPUT_DIR = 'docs/HTMLs'
+PAGES_MANIFEST_FILE = 'rendered_pages.json'  # the pages this run rendered, for sendUpdates
 INDEX_FILE = 'docs/index.html'
-
-if not os.path.exists(OUTPUT_DIR):
-    os.makedirs(OUTPUT_DIR)
+FEEDS_DIR = 'docs/feeds'
+FEED_INDEX_FILE = 'docs/feeds/index.json'
+FEED_MAX_ITEMS = 50
+SITE_URL = "https://james-n-bowman.github.io/AutomatedEmails/"
+PARLIAMENT_URL = "https://www.parliament.uk"
 
 def create_meeting_element (title, link, witness_blocks=None):
     """Creates a consistent HTML block for an item, now with optional witness lists."""
@@ -70,53 +78,69 @@ def format_date(date_str):
     except:
         return ""
 
-def main():
-    # 1. Load Data
-    try:
-        with open(JSON_FILE, 'r') as f:
-            data = json.load(f)
-    except FileNotFoundError:
-        print(f"Error: {JSON_FILE} not found.")
-        return
+def describe_event(item):
+    """Returns (display title, link, oral evidence activities) for an event."""
+    event_id = item.get('id')
+    link = f"https://committees.parliament.uk/event/{event_id}/formal-meeting-private-meeting/"
 
-    # 2. Load Mapping (ID -> Name)
-    committees_map = {}
-    try:
-        with open(MAPPING_FILE, mode='r', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            next(reader)  # Skip header
-            for row in reader:
-                if row:
-                    committees_map[row[0].strip()] = row[1].strip()
-    except FileNotFoundError:
-        print(f"Error: {MAPPING_FILE} not found.")
-        return
+    activities = item.get('activities', []) or []
+    oral_evidence_activities = [a for a in activities if a.get('activityType') == "Oral evidence"]
+
+    # Determine Inquiry Title
+    inquiry_titles = {biz.get('title') for a in oral_evidence_activities for biz in a.get('committeeBusinesses', []) if biz.get('title')}
 
-    # Keep track of generated files for the index
-    generated_committees = []
+    date_string = item.get('startDate')
+    friendly_date = format_date(date_string)
+
+    if len(inquiry_titles) == 1:
+        display_title = f"{friendly_date}: {list(inquiry_titles)[0]}"
+    elif len(inquiry_titles) > 1:
+        display_title = f"{friendly_date}: multiple inquiries"
+    else:
+        display_title = item.get('eventType', {}).get('name', 'Meeting')
+    return display_title, link, oral_evidence_activities
+
+def committee_content(data: dict, c_id: str) -> tuple:
+    """Returns (news, events, publications) in data for the committee c_id."""
+    # --- News Filtering ---
+    c_news = [n for n in data.get('news', []) if str(n.get('source_committee_id')) == c_id]
+    
+    # --- Events Filtering ---
+    # Checks if the committee ID is in the list of committee dictionaries for the event
+    c_events = [
+        e for e in data.get('events', []) 
+        if any(str(comm.get('id')) == c_id for comm in e.get('committees', []))
+    ]
+    
+    # --- Publications Filtering ---
+    c_pubs = [
+        p for p in data.get('publications', []) 
+        if str(p.get('committee', {}).get('id')) == c_id
+    ]
+    return c_news, c_events, c_pubs
 
+def render_pages(data: dict, committees_map: dict) -> list:
+    """
+    Renders one page per committee that has content this week.
 
-    # 3. Process each Committee from the mapping
+    Args:
+        data           : Parsed parliament data (events, publications, news).
+        committees_map : Committee id (string) -> committee name.
+
+    Returns a list of {'id', 'name', 'filename', 'html', 'items'} dicts,
+    html as bytes and items the (item_type, item_id) pairs on the page.
+    """
+    pages = []
+
+    # Process each Committee from the mapping
     for c_id, c_name in committees_map.items():
-        # --- News Filtering ---
-        c_news = [n for n in data.get('news', []) if str(n.get('source_committee_id')) == c_id]
-        
-        # --- Events Filtering ---
-        # Checks if the committee ID is in the list of committee dictionaries for the event
-        c_events = [
-            e for e in data.get('events', []) 
-            if any(str(comm.get('id')) == c_id for comm in e.get('committees', []))
-        ]
-        
-        # --- Publications Filtering ---
-        c_pubs = [
-            p for p in data.get('publications', []) 
-            if str(p.get('committee', {}).get('id')) == c_id
-        ]
+        started = time.perf_counter()
+        c_news, c_events, c_pubs = committee_content(data, c_id)
 
         # Only create a file if there is relevant content
         if not (c_news or c_events or c_pubs):
             print(f"Skipping Committee {c_id}: No new content.")
+            helpersMetrics.inc('render_pages_total', outcome='skipped')
             continue
 
         # Build HTML Content
@@ -139,24 +163,7 @@ def main():
         if c_events:
             content_blocks.append(E.H2("Public meetings this week", style="border-bottom: 2px solid #005ea5; padding-bottom: 5px;"))
             for item in c_events:
-                event_id = item.get('id')
-                link = f"https://committees.parliament.uk/event/{event_id}/formal-meeting-private-meeting/"
-                
-                activities = item.get('activities', []) or []
-                oral_evidence_activities = [a for a in activities if a.get('activityType') == "Oral evidence"]
-                
-                # Determine Inquiry Title
-                inquiry_titles = {biz.get('title') for a in oral_evidence_activities for biz in a.get('committeeBusinesses', []) if biz.get('title')}
-                
-                date_string = item.get('startDate')
-                friendly_date = format_date(date_string)
-
-                if len(inquiry_titles) == 1:
-                    display_title = f"{friendly_date}: {list(inquiry_titles)[0]}"
-                elif len(inquiry_titles) > 1:
-                    display_title = f"{friendly_date}: multiple inquiries"
-                else:
-                    display_title = item.get('eventType', {}).get('name', 'Meeting')
+                display_title, link, oral_evidence_activities = describe_event(item)
 
                 # Build Witness Blocks
                 witness_blocks = []
@@ -221,40 +228,320 @@ def main():
             )
         )
 
-        # Write to file in OUTPUT_DIR
-        file_name = f"{c_id}.html"
-        file_path = os.path.join(OUTPUT_DIR, file_name)
-        with open(file_path, 'wb') as f:
-            f.write(html.tostring(doc, pretty_print=True, method="html", encoding='utf-8'))
-        
-        # Add to our list for the index page
-        generated_committees.append({'id': c_id, 'name': c_name, 'filename': file_name})
-        print(f"Generated: {file_path}")
+        page_html = html.tostring(doc, pretty_print=True, method="html", encoding='utf-8')
+        pages.append({
+            'id': c_id,
+            'name': c_name,
+            'filename': f"{c_id}.html",
+            'html': page_html,
+            'items': [('event', str(e.get('id'))) for e in c_events]
+                     + [('publication', str(p.get('id'))) for p in c_pubs]
+                     + [('news', str(n.get('id'))) for n in c_news],
+        })
 
-    # --- 4. Generate the Index HTML File ---
-    if generated_committees:
-        index_items = []
-        base_url = "https://james-n-bowman.github.io/AutomatedEmails/HTMLs/"
-        
-        for item in generated_committees:
-            full_url = f"{base_url}{item['filename']}"
-            index_items.append(
-                E.LI(
-                    E.A(item['name'], href=full_url, style="color: #005ea5; text-decoration: underline;")
-                )
-            )
+        elapsed = time.perf_counter() - started
+        helpersMetrics.inc('render_pages_total', outcome='rendered')
+        helpersMetrics.observe('render_seconds', elapsed)
+        helpersMetrics.observe('render_bytes', len(page_html))
+        helpersMetrics.record('render', cttee_id=int(c_id), seconds=elapsed, bytes=len(page_html),
+                              events=len(c_events), publications=len(c_pubs), news=len(c_news))
 
-        index_doc = E.HTML(
-            E.BODY(
-                E.H1("Committee Email Previews", style="font-family: Helvetica, Arial, sans-serif;"),
-                E.UL(*index_items, style="font-family: Helvetica, Arial, sans-serif; line-height: 1.8;"),
-                style="padding: 40px; background-color: #f9f9f9;"
+    return pages
+
+def _feed_date(date_str, fallback=None):
+    """
+    ISO timestamp in UTC; the APIs give UK local times without an offset.
+    One offset throughout keeps the feeds' string sort in time order.
+    """
+    try:
+        dt = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+    except (AttributeError, ValueError):
+        return fallback
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=_london())
+    return dt.astimezone(timezone.utc).isoformat()
+
+def _london():
+    # Needs the system tz database or the tzdata package. Not falling back to
+    # UTC: that would shift summer times by an hour and churn every feed.
+    from zoneinfo import ZoneInfo
+    return ZoneInfo("Europe/London")
+
+def feed_items(c_events, c_pubs, c_news, seen_at=None) -> list:
+    """
+    Compact JSON Feed items for one committee's grouped content. Ids are
+    stable across runs (item type and API id), so a consumer can tell new
+    items from ones it already has.
+    """
+    items = []
+    for item in c_pubs:
+        published = _feed_date(item.get('publicationStartDate'), seen_at)
+        items.append({
+            'id': f"urn:parliament-committees:publication:{item.get('id')}",
+            'url': item.get('additionalContentUrl'),
+            'title': item.get('description'),
+            'summary': (item.get('type') or {}).get('name'),
+            'date_published': published,
+            'tags': ['publication'],
+        })
+    for item in c_events:
+        display_title, link, _ = describe_event(item)
+        items.append({
+            'id': f"urn:parliament-committees:event:{item.get('id')}",
+            'url': link,
+            'title': display_title,
+            'summary': (item.get('eventType') or {}).get('name'),
+            'date_published': _feed_date(item.get('startDate'), seen_at),
+            'tags': ['event'],
+        })
+    for item in c_news:
+        items.append({
+            'id': f"urn:parliament-committees:news:{item.get('id')}",
+            'url': urljoin(PARLIAMENT_URL, item.get('url') or ''),
+            'title': (item.get('heading') or '').strip(),
+            'summary': item.get('teaser'),
+            'date_published': _feed_date(item.get('datePublished'), seen_at),
+            'tags': ['news'],
+        })
+    for item in items:
+        item['_seen_at'] = seen_at
+    return items
+
+def committee_feeds(data: dict, committees_map: dict) -> list:
+    """
+    Feed items for each committee with content in data, as
+    {'id', 'name', 'filename', 'feed_items'} dicts for write_feeds. Pass the
+    data before items already emailed are filtered out: the feeds list
+    everything published, including what alerts or earlier runs delivered.
+    """
+    seen_at = data.get('metadata', {}).get('extracted_at')
+    feeds = []
+    for c_id, c_name in committees_map.items():
+        c_news, c_events, c_pubs = committee_content(data, c_id)
+        if c_news or c_events or c_pubs:
+            feeds.append({'id': c_id, 'name': c_name, 'filename': f"{c_id}.html",
+                          'feed_items': feed_items(c_events, c_pubs, c_news, seen_at)})
+    return feeds
+
+def _merge_feed_items(existing: list, new: list) -> tuple:
+    """
+    Adds this run's items to the ones already in the feed. date_modified is
+    the publication date, moved to the run time only when an item's content
+    changes, so re-running on the same data leaves the feed byte-identical.
+
+    Returns (items, changed), changed being whether the feed's items differ
+    from existing.
+    """
+    by_id = {}
+    for item in existing:
+        # Feeds written before dates were kept in UTC carry local offsets
+        for key in ('date_published', 'date_modified'):
+            if item.get(key):
+                item[key] = _feed_date(item[key], item[key])
+        by_id[item['id']] = item
+    for item in new:
+        seen_at = item.pop('_seen_at', None)
+        old = by_id.get(item['id'])
+        content = {k: v for k, v in item.items() if k != 'date_modified'}
+        if old is not None and {k: v for k, v in old.items() if k != 'date_modified'} == content:
+            continue
+        item['date_modified'] = (seen_at or item['date_published']) if old is not None else item['date_published']
+        by_id[item['id']] = item
+    order = lambda i: (i.get('date_modified') or '', i['id'])
+    items = sorted(by_id.values(), key=order, reverse=True)[:FEED_MAX_ITEMS]
+    return items, items != sorted(existing, key=order, reverse=True)
+
+def _write_if_changed(path: str, content: bytes) -> bool:
+    """Leaves unchanged files alone so their ETag and Last-Modified hold."""
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == content:
+                return False
+    except FileNotFoundError:
+        pass
+    with helpersFiles.atomic_write(path, 'wb') as f:
+        f.write(content)
+    return True
+
+def render_atom(feed: dict) -> bytes:
+    """Renders a JSON Feed dict as an Atom feed."""
+    from lxml import etree
+
+    ns = "http://www.w3.org/2005/Atom"
+    A = lambda tag, text=None, **attrs: _atom_element(etree, ns, tag, text, **attrs)
+    root = etree.Element(f"{{{ns}}}feed", nsmap={None: ns})
+    atom_url = feed['feed_url'].replace('.json', '.xml')
+    root.append(A("id", atom_url))
+    root.append(A("title", feed['title']))
+    root.append(A("updated", feed['_updated']))
+    root.append(A("link", rel="self", href=atom_url))
+    root.append(A("link", rel="alternate", href=feed['home_page_url']))
+    author = A("author")
+    author.append(A("name", feed['title']))
+    root.append(author)
+    for item in feed['items']:
+        entry = A("entry")
+        entry.append(A("id", item['id']))
+        entry.append(A("title", item['title'] or ''))
+        entry.append(A("link", rel="alternate", href=item['url'] or feed['home_page_url']))
+        entry.append(A("published", item['date_published']))
+        entry.append(A("updated", item['date_modified']))
+        entry.append(A("category", term=item['tags'][0]))
+        if item.get('summary'):
+            entry.append(A("summary", item['summary']))
+        root.append(entry)
+    return etree.tostring(root, pretty_print=True, xml_declaration=True, encoding='utf-8')
+
+def _atom_element(etree, ns, tag, text=None, **attrs):
+    element = etree.Element(f"{{{ns}}}{tag}", **attrs)
+    if text is not None:
+        element.text = text
+    return element
+
+def write_feeds(feeds: list, updated_at: str = None, index: bool = True) -> None:
+    """
+    Writes a JSON Feed (feeds/<id>.json) and an Atom feed (feeds/<id>.xml)
+    for each of committee_feeds(), adding this run's items to those already
+    there, then, if index, the feed index.
+
+    A feed's updated time is when its items last changed, updated_at (default
+    now) if this run changed them. An item's publication date would not do:
+    items can turn up after newer ones, and readers polling on updated would
+    miss them.
+    """
+    updated_at = updated_at or datetime.now(timezone.utc).isoformat()
+    os.makedirs(FEEDS_DIR, exist_ok=True)
+    for page in feeds:
+        json_path = os.path.join(FEEDS_DIR, f"{page['id']}.json")
+        existing = {}
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                existing = json.load(f)
+        except FileNotFoundError:
+            pass
+        items, changed = _merge_feed_items(existing.get('items', []), [dict(item) for item in page['feed_items']])
+        feed = {
+            'version': "https://jsonfeed.org/version/1.1",
+            'title': page['name'],
+            'home_page_url': f"{SITE_URL}HTMLs/{page['filename']}",
+            'feed_url': f"{SITE_URL}feeds/{page['id']}.json",
+            '_committee_id': int(page['id']),
+            '_updated': updated_at if changed or not existing.get('_updated') else existing['_updated'],
+            'items': items,
+        }
+        if _write_if_changed(json_path, json.dumps(feed, indent=1, ensure_ascii=False).encode('utf-8')):
+            print(f"Generated Feed: {json_path}")
+        _write_if_changed(os.path.join(FEEDS_DIR, f"{page['id']}.xml"), render_atom(feed))
+    if index:
+        write_feed_index()
+
+def write_feed_index() -> None:
+    """Lists every committee feed in FEEDS_DIR with its last update, in FEED_INDEX_FILE."""
+    feeds = []
+    for filename in os.listdir(FEEDS_DIR) if os.path.isdir(FEEDS_DIR) else []:
+        if not filename.endswith('.json') or os.path.join(FEEDS_DIR, filename) == FEED_INDEX_FILE:
+            continue
+        with open(os.path.join(FEEDS_DIR, filename), 'r', encoding='utf-8') as f:
+            feed = json.load(f)
+        feeds.append({
+            'id': feed['_committee_id'],
+            'name': feed['title'],
+            'json': feed['feed_url'],
+            'atom': feed['feed_url'].replace('.json', '.xml'),
+            'updated': feed['_updated'],
+            'items': len(feed['items']),
+        })
+    if not feeds:
+        return
+    feeds.sort(key=lambda f: f['id'])
+    index = {
+        'updated': max((f['updated'] for f in feeds if f['updated']), default=None),
+        'feeds': feeds,
+    }
+    if _write_if_changed(FEED_INDEX_FILE, json.dumps(index, indent=1, ensure_ascii=False).encode('utf-8')):
+        print(f"Generated Feed Index: {FEED_INDEX_FILE}")
+
+def render_index(pages: list) -> bytes:
+    """Renders the preview index linking to each generated page."""
+    index_items = []
+    base_url = f"{SITE_URL}HTMLs/"
+    
+    for item in pages:
+        full_url = f"{base_url}{item['filename']}"
+        index_items.append(
+            E.LI(
+                E.A(item['name'], href=full_url, style="color: #005ea5; text-decoration: underline;")
             )
         )
 
+    index_doc = E.HTML(
+        E.BODY(
+            E.H1("Committee Email Previews", style="font-family: Helvetica, Arial, sans-serif;"),
+            E.UL(*index_items, style="font-family: Helvetica, Arial, sans-serif; line-height: 1.8;"),
+            style="padding: 40px; background-color: #f9f9f9;"
+        )
+    )
+    return html.tostring(index_doc, pretty_print=True, method="html", encoding='utf-8')
+
+def write_manifest(pages: list, manifest_file: str = PAGES_MANIFEST_FILE) -> None:
+    """
+    Lists this run's pages, and the items on each, in manifest_file.
+    OUTPUT_DIR keeps the pages of earlier weeks for committees with nothing
+    new, so the send step goes by this list rather than by what is on disk,
+    and records as delivered only the items a sent page contained.
+    """
+    manifest = {'pages': [{key: page[key] for key in ('id', 'name', 'filename', 'items')} for page in pages]}
+    with helpersFiles.atomic_write(manifest_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=4)
+
+def write_pages(pages: list, index: bool = True, manifest_file: str = PAGES_MANIFEST_FILE) -> None:
+    """
+    Writes rendered pages to OUTPUT_DIR, the manifest of this run's pages
+    and, if there are any, the index. Sharded runs pass their own
+    manifest_file and index=False, and rebuild the indexes once in the merge.
+    """
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    for page in pages:
+        file_path = os.path.join(OUTPUT_DIR, page['filename'])
+        with open(file_path, 'wb') as f:
+            f.write(page['html'])
+        print(f"Generated: {file_path}")
+    write_manifest(pages, manifest_file)
+
+    if index and pages:
         with open(INDEX_FILE, 'wb') as f:
-            f.write(html.tostring(index_doc, pretty_print=True, method="html", encoding='utf-8'))
+            f.write(render_index(pages))
         print(f"Generated Index: {INDEX_FILE}")
 
+def main():
+    # 1. Load Data
+    try:
+        with open(JSON_FILE, 'r') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        print(f"Error: {JSON_FILE} not found.")
+        return
+
+    # 2. Load Mapping (ID -> Name)
+    registry = helpersCSVMapping.get_pipeline_registry()
+    if not registry.exists:
+        print(f"Error: {registry.filepath} not found.")
+        return
+    committees_map = {str(row.cttee_id): row.cttee_name for row in registry}
+    feeds = committee_feeds(data, committees_map)
+    extracted_at = data.get('metadata', {}).get('extracted_at')
+
+    # Leave out what earlier runs already emailed
+    if helpersSeenStore.enabled():
+        with helpersSeenStore.SeenStore() as store:
+            data, dropped = store.filter_undelivered(data)
+        helpersSeenStore.report_dropped(dropped)
+
+    # 3. Render a page per committee, then write them and the index
+    pages = render_pages(data, committees_map)
+    write_pages(pages)
+    write_feeds(feeds, extracted_at)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import helpersProfile
+    helpersProfile.run_main(main, "render", "Render a page per committee from parliament_data.json.")
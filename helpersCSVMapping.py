@@ -1,127 +1,391 @@
 import csv
 import os
+import threading
+from typing import NamedTuple
+
+import helpersFiles
 
 MAPPING_CSV_FILEPATH = 'mapping.csv'
+MAPPING_CSV_HEADER = ["cttee_id", "cttee_name", "interest_id"]
+SIDECAR_SUFFIX = '.sqlite'
 
-def check_CSV_for_duplicates(cttee_id: int, interest_id: str) -> bool:
-    """
-    Checks whether any of the three values already exist in their respective
-    columns in an existing CSV file. Also verifies the file can be opened for
-    writing.
+# One mapping per house, as the committees API reports it. mapping.csv stays the Commons one.
+HOUSES = ('Commons', 'Lords', 'Joint')
+HOUSE_MAPPING_FILEPATHS = {
+    'Commons': MAPPING_CSV_FILEPATH,
+    'Lords': 'mapping_lords.csv',
+    'Joint': 'mapping_joint.csv',
+}
 
-    Returns True if the entry can safely be written (no duplicates found),
-    False if a duplicate exists or the file cannot be accessed.
+class MappingRow(NamedTuple):
+    cttee_id: int
+    cttee_name: str
+    interest_id: str
 
-    Args:
-        cttee_id    : Committee ID (integer).
-        campaign_id : Campaign ID (string).
-        interest_id : Interest ID (string).
+class MappingRegistry:
     """
+    The committee -> MailChimp interest mapping, loaded once and indexed by
+    committee id and by interest id.
 
-    # Check the file can be opened for writing
-    try:
-        with open(MAPPING_CSV_FILEPATH, "a", newline="") as f:
-            pass  # just test write access
-    except OSError as e:
-        print(f"Error: File '{MAPPING_CSV_FILEPATH}' cannot be opened for writing: {e}")
-        return False
+    The CSV stays the source of truth. With use_sidecar=True a SQLite copy is
+    kept next to it and used on load while the CSV is unchanged (same mtime
+    and size), which avoids re-parsing large mappings.
+    """
 
-    # Read existing rows
-    try:
-        with open(MAPPING_CSV_FILEPATH, "r", newline="") as f:
-            reader = csv.reader(f)
-            rows = list(reader)
-    except OSError as e:
-        print(f"Error: Could not read file '{MAPPING_CSV_FILEPATH}': {e}")
-        return False
+    def __init__(self, filepath: str = MAPPING_CSV_FILEPATH, use_sidecar: bool = False):
+        self.filepath = filepath
+        self.use_sidecar = use_sidecar
+        self.sidecar_path = filepath + SIDECAR_SUFFIX
+        self.rows = []
+        self.by_cttee_id = {}
+        self.by_interest_id = {}
+        self.exists = False
+        self._signature = None
+        self._lock = threading.RLock()
+        self.load()
+
+    # --- loading ---
+
+    def _file_signature(self):
+        try:
+            st = os.stat(self.filepath)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
 
-    # Skip header row when checking for duplicates
-    data_rows = rows[1:] if rows else []
-    if len(data_rows)==0:
-        return False
+    def is_stale(self) -> bool:
+        """True if the CSV changed on disk since it was loaded."""
+        return self._file_signature() != self._signature
 
-    for row in data_rows:
+    def load(self):
+        with self._lock:
+            signature = self._file_signature()
+            self.exists = signature is not None
+            rows = []
+            if self.exists:
+                rows = self._load_sidecar(signature) if self.use_sidecar else None
+                if rows is None:
+                    rows = self._parse_csv()
+                    if self.use_sidecar:
+                        self._write_sidecar(rows, signature)
+            self._index(rows)
+            self._signature = signature
 
-        if len(row) < 3:
-            continue  # skip malformed rows
+    def _parse_csv(self) -> list:
+        rows = []
+        with open(self.filepath, mode='r', encoding='utf-8', newline='') as f:
+            for row in csv.reader(f):
+                if len(row) < 3:
+                    continue  # blank or malformed
+                try:
+                    cttee_id = int(row[0])
+                except ValueError:
+                    continue  # header row or non-integer id
+                # Older files may carry an extra campaign_id column before interest_id
+                rows.append(MappingRow(cttee_id, row[1].strip(), row[-1].strip()))
+        return rows
 
+    def _index(self, rows):
+        self.rows = []
+        self.by_cttee_id = {}
+        self.by_interest_id = {}
+        for row in rows:
+            if row.cttee_id in self.by_cttee_id or row.interest_id in self.by_interest_id:
+                continue  # first occurrence wins, as duplicates were never meant to be written
+            self.rows.append(row)
+            self.by_cttee_id[row.cttee_id] = row
+            self.by_interest_id[row.interest_id] = row
+
+    # --- sidecar ---
+
+    def _load_sidecar(self, signature):
+        import sqlite3
+        from contextlib import closing
+
+        if not os.path.exists(self.sidecar_path):
+            return None
         try:
-            if int(row[0]) == cttee_id:
-                print(f"Error: cttee_id '{cttee_id}' already exists in the file.")
-                return True
-        except ValueError:
-            pass  # non-integer in column; skip comparison
-
-        if row[2] == interest_id:
-            print(f"Error: interest_id '{interest_id}' already exists in the file.")
+            with closing(sqlite3.connect(self.sidecar_path)) as conn:
+                meta = conn.execute("SELECT csv_mtime_ns, csv_size FROM meta").fetchone()
+                if meta is None or tuple(meta) != signature:
+                    return None
+                return [MappingRow(*r) for r in conn.execute(
+                    "SELECT cttee_id, cttee_name, interest_id FROM mapping ORDER BY position")]
+        except sqlite3.Error:
+            return None
+
+    def _write_sidecar(self, rows, signature):
+        import sqlite3
+
+        tmp_path = self.sidecar_path + '.tmp'
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        conn = sqlite3.connect(tmp_path)
+        try:
+            with conn:
+                conn.execute("CREATE TABLE meta (csv_mtime_ns INTEGER, csv_size INTEGER)")
+                conn.execute("CREATE TABLE mapping (position INTEGER, cttee_id INTEGER PRIMARY KEY, "
+                             "cttee_name TEXT, interest_id TEXT UNIQUE)")
+                conn.execute("INSERT INTO meta VALUES (?, ?)", signature)
+                conn.executemany("INSERT OR IGNORE INTO mapping VALUES (?, ?, ?, ?)",
+                                 [(n, *row) for n, row in enumerate(rows)])
+        finally:
+            conn.close()
+        os.replace(tmp_path, self.sidecar_path)
+
+    # --- lookups ---
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(list(self.rows))
+
+    def __contains__(self, cttee_id):
+        return int(cttee_id) in self.by_cttee_id
+
+    def get(self, cttee_id):
+        """Returns the MappingRow for a committee id, or None."""
+        return self.by_cttee_id.get(int(cttee_id))
+
+    def get_by_interest(self, interest_id: str):
+        """Returns the MappingRow for a MailChimp interest id, or None."""
+        return self.by_interest_id.get(interest_id)
+
+    def cttee_ids(self) -> set:
+        return set(self.by_cttee_id)
+
+    def find_duplicate(self, cttee_id: int, interest_id: str):
+        """Returns a description of the clash if either id is already mapped, else None."""
+        if int(cttee_id) in self.by_cttee_id:
+            return f"cttee_id '{cttee_id}' already exists in the file."
+        if interest_id in self.by_interest_id:
+            return f"interest_id '{interest_id}' already exists in the file."
+        return None
+
+    # --- changes ---
+
+    def add(self, cttee_id: int, cttee_name: str, interest_id: str) -> bool:
+        """Adds a row in memory. Returns False (and changes nothing) on a duplicate."""
+        with self._lock:
+            if self.find_duplicate(cttee_id, interest_id):
+                return False
+            row = MappingRow(int(cttee_id), cttee_name, interest_id)
+            self.rows.append(row)
+            self.by_cttee_id[row.cttee_id] = row
+            self.by_interest_id[row.interest_id] = row
             return True
 
-    return False
+    def save(self) -> None:
+        """
+        Rewrites the CSV in one pass via a temporary file and os.replace, so
+        readers never see a half-written mapping.
+        """
+        with self._lock:
+            with helpersFiles.atomic_write(self.filepath, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(MAPPING_CSV_HEADER)
+                writer.writerows(self.rows)
+            self.exists = True
+            self._signature = self._file_signature()
+            if self.use_sidecar:
+                self._write_sidecar(self.rows, self._signature)
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+def get_registry(filepath: str = None, use_sidecar: bool = None) -> MappingRegistry:
+    """
+    Returns the process-wide registry for filepath, loading it on first use and
+    reloading only if the file has changed on disk since.
+
+    On first load the sidecar defaults to on when MAPPING_SIDECAR=1 is set in
+    the environment.
+    """
+    filepath = filepath or MAPPING_CSV_FILEPATH
+    key = os.path.abspath(filepath)
+    with _registries_lock:
+        registry = _registries.get(key)
+        if registry is None:
+            if use_sidecar is None:
+                use_sidecar = os.environ.get('MAPPING_SIDECAR') == '1'
+            registry = MappingRegistry(filepath, use_sidecar)
+            _registries[key] = registry
+        elif use_sidecar is not None and registry.use_sidecar != use_sidecar:
+            registry.use_sidecar = use_sidecar
+            registry.load()
+        elif registry.is_stale():
+            registry.load()
+        return registry
 
-def create_mapping_CSV ():
+class CombinedRegistry:
     """
-    If the file does not exist, creates it with a header row then writes the new
-    row. 
+    Read-only view over several houses' registries, so the pipeline renders
+    and sends for every house in one pass. A committee (or interest) mapped
+    in more than one house, such as a joint committee, is kept once, under
+    the first house listed.
+    """
+
+    def __init__(self, registries: dict):
+        self.registries = registries
+        self.houses = list(registries)
+        self.exists = any(r.exists for r in registries.values())
+        self.filepath = ", ".join(r.filepath for r in registries.values())
+        self.rows = []
+        self.by_cttee_id = {}
+        self.by_interest_id = {}
+        self.house_by_cttee_id = {}
+        for house, registry in registries.items():
+            for row in registry:
+                if row.cttee_id in self.by_cttee_id or row.interest_id in self.by_interest_id:
+                    continue
+                self.rows.append(row)
+                self.by_cttee_id[row.cttee_id] = row
+                self.by_interest_id[row.interest_id] = row
+                self.house_by_cttee_id[row.cttee_id] = house
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(list(self.rows))
+
+    def __contains__(self, cttee_id):
+        return int(cttee_id) in self.by_cttee_id
+
+    def get(self, cttee_id):
+        return self.by_cttee_id.get(int(cttee_id))
+
+    def get_by_interest(self, interest_id: str):
+        return self.by_interest_id.get(interest_id)
+
+    def cttee_ids(self) -> set:
+        return set(self.by_cttee_id)
+
+    def house_of(self, cttee_id):
+        return self.house_by_cttee_id.get(int(cttee_id))
+
+def configured_houses(houses=None) -> list:
+    """
+    The houses a pipeline run covers: houses if given, else PIPELINE_HOUSES
+    (comma-separated), else every house whose mapping file exists. Commons
+    is the fallback so a missing mapping.csv is still reported.
+    """
+    if houses is None and os.environ.get('PIPELINE_HOUSES'):
+        houses = [h.strip() for h in os.environ['PIPELINE_HOUSES'].split(',') if h.strip()]
+    if houses is None:
+        houses = [h for h in HOUSES if os.path.exists(HOUSE_MAPPING_FILEPATHS[h])] or ['Commons']
+    unknown = [h for h in houses if h not in HOUSE_MAPPING_FILEPATHS]
+    if unknown:
+        raise ValueError(f"Unknown house(s): {', '.join(unknown)} (choose from {', '.join(HOUSES)})")
+    return list(houses)
+
+def get_pipeline_registry(houses=None) -> CombinedRegistry:
+    """The combined registry for the houses a run covers (see configured_houses)."""
+    return CombinedRegistry({h: get_registry(HOUSE_MAPPING_FILEPATHS[h]) for h in configured_houses(houses)})
+
+def check_CSV_for_duplicates(cttee_id: int, interest_id: str, house: str = 'Commons') -> bool:
     """
+    Checks whether the committee id or interest id is already mapped.
 
-    file_exists = os.path.exists(MAPPING_CSV_FILEPATH)
+    Returns True if a duplicate exists (so the entry should not be written),
+    False if the entry can safely be added.
+
+    Args:
+        cttee_id    : Committee ID (integer).
+        interest_id : Interest ID (string).
+        house       : House whose mapping to check.
+    """
+    duplicate = get_registry(HOUSE_MAPPING_FILEPATHS[house]).find_duplicate(cttee_id, interest_id)
+    if duplicate:
+        print(f"Error: {duplicate}")
+        return True
+    return False
+
+def create_mapping_CSV (house: str = 'Commons'):
+    """
+    If house's mapping file does not exist, creates it with a header row.
+    """
+    filepath = HOUSE_MAPPING_FILEPATHS[house]
+    file_exists = os.path.exists(filepath)
 
     if not file_exists:
         try:
-            with open(MAPPING_CSV_FILEPATH, "w", newline="") as f:
+            with open(filepath, "w", newline="") as f:
                 writer = csv.writer(f)
-                writer.writerow(["cttee_id", "cttee_name", "campaign_id", "interest_id"])
-            print(f"Created '{MAPPING_CSV_FILEPATH}' and wrote new row successfully.")
+                writer.writerow(MAPPING_CSV_HEADER)
+            print(f"Created '{filepath}'.")
         except OSError as e:
-            print(f"Error: Could not create file at '{MAPPING_CSV_FILEPATH}': {e}")
-        return    
+            print(f"Error: Could not create file at '{filepath}': {e}")
+        return
 
-def write_to_mapping_CSV(cttee_id: int, cttee_name: str, interest_id: str) -> None:
+def write_to_mapping_CSV(cttee_id: int, cttee_name: str, interest_id: str, house: str = 'Commons') -> None:
     """
-    Writes a new row (cttee_id, campaign_id, interest_id) to a CSV file.
+    Writes a new row (cttee_id, cttee_name, interest_id) to house's mapping.
 
     Args:
         cttee_id    : Committee ID (integer).
-        campaign_id : Campaign ID (string).
+        cttee_name  : Committee name (string).
         interest_id : Interest ID (string).
+        house       : House whose mapping to write.
+    """
+    write_rows_to_mapping_CSV([(cttee_id, cttee_name, interest_id)], house)
+
+def write_rows_to_mapping_CSV(rows: list, house: str = 'Commons') -> list:
     """
+    Adds (cttee_id, cttee_name, interest_id) rows to house's mapping and
+    rewrites the file once for all of them, not once per row. Rows whose
+    committee or interest is already mapped are reported and skipped.
 
+    Returns the rows written.
+    """
+    registry = get_registry(HOUSE_MAPPING_FILEPATHS[house])
+    added = []
+    for row in rows:
+        duplicate = registry.find_duplicate(row[0], row[2])
+        if duplicate:
+            print(f"Error: {duplicate}")
+        elif registry.add(*row):
+            added.append(row)
+    if not added:
+        return added
     try:
-        with open(MAPPING_CSV_FILEPATH, "a", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow([cttee_id, cttee_name, interest_id])
-        print(f"Row written successfully to '{MAPPING_CSV_FILEPATH}'.")
+        registry.save()
+        print(f"{len(added)} row(s) written successfully to '{registry.filepath}'.")
     except OSError as e:
-        print(f"Error: Could not write to file '{MAPPING_CSV_FILEPATH}': {e}")
+        print(f"Error: Could not write to file '{registry.filepath}': {e}")
+        registry.load()  # drop the unsaved rows
+        return []
+    return added
 
 
-def fetch_cttee_ids_from_mapping_CSV ():
-    with open('mapping.csv', mode='r', encoding='utf-8') as f:
-        reader = csv.reader(f)
-        next(reader)  # Skip the header row
-            
-        # Extract IDs from the first column
-        committee_ids = {int(row[0]) for row in reader if row}
-        return(committee_ids)
+def fetch_cttee_ids_from_mapping_CSV (house: str = 'Commons'):
+    registry = get_registry(HOUSE_MAPPING_FILEPATHS[house])
+    if not registry.exists:
+        raise FileNotFoundError(registry.filepath)
+    return registry.cttee_ids()
 
-def update_mapping_CSV(cttee_id: int, cttee_name: str, interest_id: str) -> None:
+def update_mapping_CSV(cttee_id: int, cttee_name: str, interest_id: str, house: str = 'Commons') -> None:
     """
-    Writes a new row (cttee_id, campaign_id, interest_id) to a CSV file.
+    Writes a new row (cttee_id, cttee_name, interest_id) to house's mapping CSV.
 
     - If the file does not exist, creates it with a header row.
-    - If the file exists but cannot be opened for writing, reports the problem and returns.
-    - Before writing to an existing file, checks that none of the three values already
-      exist in their respective columns; if a duplicate is found, reports and returns.
-    - Otherwise, appends the new row.
+    - If either id is already mapped, reports the duplicate and returns.
+    - Otherwise, adds the row and rewrites the file atomically.
 
     Args:
         cttee_id    : Committee ID (integer).
-        campaign_id : Campaign ID (string).
+        cttee_name  : Committee name (string).
         interest_id : Interest ID (string).
+        house       : House whose mapping to update.
     """
-    create_mapping_CSV()
+    update_mapping_CSV_rows([(cttee_id, cttee_name, interest_id)], house)
 
-    if check_CSV_for_duplicates(cttee_id, interest_id):
-        return
+def update_mapping_CSV_rows(rows: list, house: str = 'Commons') -> list:
+    """
+    update_mapping_CSV for many rows, rewriting the file once.
 
-    write_to_mapping_CSV(cttee_id, cttee_name, interest_id)
\ No newline at end of file
+    Returns the rows written.
+    """
+    create_mapping_CSV(house)
+    return write_rows_to_mapping_CSV(rows, house)
@@ -1,75 +1,228 @@
+import hashlib
 import json
 import logging
-import urllib.request
-from urllib.error import URLError
+import os
+from datetime import datetime, timedelta, timezone
+
+import helpersFiles
+import helpersHTTP
 
 CTTEE_API_BASE_URL = "https://committees-api.parliament.uk/api/"
 PAGE_SIZE = 30
+ALLOWED_CATEGORIES = ['Select', 'General', 'Other']
+
+CATALOGUE_FILEPATH = 'committees_catalogue.json'
+CATALOGUE_CHECK_INTERVAL = timedelta(hours=12)  # how often to probe the API for changes
+CATALOGUE_MAX_AGE = timedelta(days=2)           # full re-sync at least this often
+SYNC_WORKERS = 8
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.DEBUG)
 
-def fetch_committees_dict(committeeCategory:str = None, allowed_cttee_types:list = None, allow_subs:bool = False) -> dict:
+def _fetch_committees_page(skip: int, take: int = PAGE_SIZE) -> dict:
+    url = f"{CTTEE_API_BASE_URL}Committees?ShowOnWebsiteOnly=true&Take={take}&Skip={skip}"
+    logger.debug("Fetching: %s", url)
+    try:
+        response = helpersHTTP.get(url)
+        response.raise_for_status()
+        return response.json()
+    except OSError as e:  # requests' exceptions derive from IOError
+        raise RuntimeError(f"Failed to fetch committees from API: {e}") from e
+
+def _page_digest(page: dict) -> str:
+    """Checksum of a page's total and items, to tell whether the list changed."""
+    content = json.dumps([page["totalResults"], page["items"]], sort_keys=True)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+def _as_list(value) -> list:
+    """Accepts a single name or a list of names; a bare string is one name, not its characters."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return [value]
+    return list(value)
+
+class CommitteeCatalogue:
+    """
+    Local copy of the whole /api/Committees list, indexed by house, category,
+    committee type and parent committee.
+
+    The API has no "changed since" filter, so a refresh fetches the first
+    page and only re-syncs when its checksum (the total and every field of
+    its items) has changed or the copy is older than CATALOGUE_MAX_AGE. A
+    change confined to later pages, such as a renamed committee, is
+    therefore only picked up by that full re-sync. A full sync fetches all
+    pages concurrently once the first page has reported the total.
+    """
+
+    def __init__(self, filepath: str = CATALOGUE_FILEPATH):
+        self.filepath = filepath
+        self.committees = {}
+        self.total_results = None
+        self.first_page_digest = None
+        self.synced_at = None
+        self.checked_at = None
+        self._build_indexes()
+
+    # --- persistence ---
+
+    def load(self) -> bool:
+        """Loads the saved catalogue. Returns False if there is none."""
+        if not os.path.exists(self.filepath):
+            return False
+        with open(self.filepath, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        self.committees = {item["id"]: item for item in saved["committees"]}
+        self.total_results = saved.get("total_results")
+        self.first_page_digest = saved.get("first_page_digest")
+        self.synced_at = datetime.fromisoformat(saved["synced_at"]) if saved.get("synced_at") else None
+        self.checked_at = datetime.fromisoformat(saved["checked_at"]) if saved.get("checked_at") else None
+        self._build_indexes()
+        return True
+
+    def save(self) -> None:
+        saved = {
+            "synced_at": self.synced_at.isoformat() if self.synced_at else None,
+            "checked_at": self.checked_at.isoformat() if self.checked_at else None,
+            "total_results": self.total_results,
+            "first_page_digest": self.first_page_digest,
+            "committees": list(self.committees.values()),
+        }
+        with helpersFiles.atomic_write(self.filepath, 'w', encoding='utf-8') as f:
+            json.dump(saved, f)
+
+    # --- syncing ---
+
+    def sync(self, max_workers: int = SYNC_WORKERS, first: dict = None) -> None:
+        """
+        Downloads the full committee list, fetching pages concurrently.
+        first is the first page if the caller already has it.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        first = first or _fetch_committees_page(0)
+        total_results = first["totalResults"]
+        skips = range(PAGE_SIZE, total_results, PAGE_SIZE)
+        pages = [first]
+        if skips:
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                pages.extend(pool.map(_fetch_committees_page, skips))
+
+        committees = {}
+        for page in pages:
+            for item in page["items"]:
+                committees[item["id"]] = item
+        if len(committees) < total_results:
+            logger.warning("Catalogue sync got %d of %d committees.", len(committees), total_results)
+
+        now = datetime.now(timezone.utc)
+        self.committees = committees
+        self.total_results = total_results
+        self.first_page_digest = _page_digest(first)
+        self.synced_at = now
+        self.checked_at = now
+        self._build_indexes()
+        self.save()
+        logger.info("Synced %d committees in %d pages.", len(committees), len(pages))
+
+    def refresh(self, force: bool = False) -> None:
+        """
+        Brings the catalogue up to date, doing as little work as possible.
+
+        If the API cannot be reached, a copy younger than CATALOGUE_MAX_AGE
+        is served as it is, with a warning; only a missing or expired copy
+        (or force) makes the failure fatal.
+        """
+        now = datetime.now(timezone.utc)
+        if force or self.synced_at is None or now - self.synced_at > CATALOGUE_MAX_AGE:
+            self.sync()
+            return
+        if self.checked_at and now - self.checked_at < CATALOGUE_CHECK_INTERVAL:
+            return
+        try:
+            first = _fetch_committees_page(0)
+            if _page_digest(first) != self.first_page_digest:
+                logger.info("Committee list changed (%s -> %d committees); re-syncing.",
+                            self.total_results, first["totalResults"])
+                self.sync(first=first)
+                return
+        except (RuntimeError, ValueError, KeyError) as e:
+            logger.warning("Could not check the committee catalogue (%s); using the copy synced %s.",
+                           e, self.synced_at.isoformat())
+            return
+        self.checked_at = now
+        self.save()
+
+    # --- indexes and queries ---
+
+    def _build_indexes(self):
+        self.by_house = {}
+        self.by_category = {}
+        self.by_type = {}
+        self.by_parent = {}
+        for cttee_id, item in self.committees.items():
+            self.by_house.setdefault(item.get("house"), set()).add(cttee_id)
+            self.by_category.setdefault((item.get("category") or {}).get("name"), set()).add(cttee_id)
+            for ct in item.get("committeeTypes") or []:
+                self.by_type.setdefault(ct.get("name"), set()).add(cttee_id)
+            parent_id = (item.get("parentCommittee") or {}).get("id")
+            self.by_parent.setdefault(parent_id, set()).add(cttee_id)
+
+    def query(self, house: str = "Commons", category: str = None, cttee_types=None,
+              allow_subs: bool = False) -> list:
+        """
+        Returns matching committee ids in catalogue order. Any argument left as
+        None is not filtered on; allow_subs=False keeps top-level committees only.
+        """
+        candidates = [set(self.committees)]
+        if house is not None:
+            candidates.append(self.by_house.get(house, set()))
+        if category is not None:
+            candidates.append(self.by_category.get(category, set()))
+        cttee_types = _as_list(cttee_types)
+        if cttee_types is not None:
+            candidates.append(set().union(*(self.by_type.get(t, set()) for t in cttee_types)))
+        if not allow_subs:
+            candidates.append(self.by_parent.get(None, set()))
+        matched = set.intersection(*candidates)
+        return [cttee_id for cttee_id in self.committees if cttee_id in matched]
+
+_catalogue = None
+
+def get_catalogue(refresh: bool = True) -> CommitteeCatalogue:
+    """Returns the process-wide catalogue, loading it from disk and refreshing it once."""
+    global _catalogue
+    if _catalogue is None:
+        catalogue = CommitteeCatalogue()
+        catalogue.load()
+        if refresh:
+            catalogue.refresh()
+        _catalogue = catalogue
+    return _catalogue
+
+def fetch_committees_dict(committeeCategory:str = None, allowed_cttee_types:list = None, allow_subs:bool = False, house:str = "Commons") -> dict:
     """
-    Fetch committee data from the Parliament API.
+    Fetch committee data from the local committee catalogue, syncing it from
+    the Parliament API when it is missing or out of date.
 
     Returns:
         Dictionary with committee IDs as keys and committee data as values,
-        filtered to Commons committees only.
+        filtered to Commons committees only by default.
     """
-    base_url = f"{CTTEE_API_BASE_URL}Committees?ShowOnWebsiteOnly=true&Take={PAGE_SIZE}"
-    if committeeCategory == None:
-        pass 
-    elif committeeCategory in ['Select', 'General', 'Other']:
-        base_url += f'&CommitteeCategory={committeeCategory}'
-    else:
+    if committeeCategory is not None and committeeCategory not in ALLOWED_CATEGORIES:
         logging.error('Committee category not recognised.')
-    committees = {}
-    skip = 0
-    total_results = 1
-
-    while skip < total_results:
-        url = f"{base_url}&Skip={skip}"
-        logger.debug("Fetching: %s", url)
-
-        try:
-            with urllib.request.urlopen(url) as response:
-                data = json.loads(response.read().decode())
-        except URLError as e:
-            raise RuntimeError(f"Failed to fetch committees from API: {e}") from e
-
-        total_results = data["totalResults"]
-        items = data["items"]
-
-        if not items:
-            logger.warning("Received empty page at skip=%d, stopping early.", skip)
-            break  # Safeguard against empty pages causing infinite loops
-
-        for item in items:
-            skip += 1
-
-            cttee_types = item.get('committeeTypes')
-            if not any(ct.get('name') in allowed_cttee_types for ct in cttee_types):
-                continue
-
-            if item.get("house") != "Commons":
-                continue
-
-            if allow_subs == False and item.get('parentCommittee') != None:
-                continue
-
-            item_id = item.pop("id")
-            committees[item_id] = item
+        committeeCategory = None
 
+    catalogue = get_catalogue()
+    committees = {}
+    for cttee_id in catalogue.query(house, committeeCategory, allowed_cttee_types, allow_subs):
+        item = dict(catalogue.committees[cttee_id])
+        item.pop("id")
+        committees[cttee_id] = item
 
-    logger.info("Fetched %d Commons committees (total results reported: %d).", len(committees), total_results)
+    logger.info("Found %d %s committees (catalogue holds %d).", len(committees), house or "", len(catalogue.committees))
     return committees
 
 def list_committees(allowed_committee_category:str=None, allowed_cttee_types:list = None, allow_subs:bool = False) -> dict:
     cttees = fetch_committees_dict(allowed_committee_category, allowed_cttee_types, allow_subs)
     for cttee_id, cttee_value in cttees.items():
         print(cttee_id, cttee_value.get('name'), sep="   ")
-
-
-
-    
\ No newline at end of file
@@ -0,0 +1,47 @@
+import os
+from contextlib import contextmanager
+
+def _read_umask() -> int:
+    # The umask can only be read by setting it, so set it straight back. Done
+    # once, at import: briefly changing it while other threads create files
+    # would give their files the wrong mode.
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+# The mode open() gives a new file: 0666 less the process umask
+DEFAULT_MODE = 0o666 & ~_read_umask()
+
+@contextmanager
+def atomic_write(path: str, mode: str = 'w', **open_kwargs):
+    """
+    Opens a temporary file next to path and, if the with-block succeeds,
+    moves it over path in one step, so readers never see a half-written
+    file. On error the temporary file is removed and path is left alone.
+
+    The temporary name is unique, so concurrent writers (e.g. shards) do not
+    trample each other. The result keeps path's permissions if it already
+    exists, else gets the ones open() would have given it; mkstemp's 0600
+    would otherwise replace them.
+
+    open_kwargs are passed to open(), e.g. encoding='utf-8' or newline=''.
+    """
+    import tempfile
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    try:
+        file_mode = os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        file_mode = DEFAULT_MODE
+
+    base = os.path.basename(path)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{base}-", suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, mode, **open_kwargs) as f:
+            yield f
+        os.chmod(tmp_path, file_mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
@@ -0,0 +1,228 @@
+import base64
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlencode, urlsplit
+
+import helpersMetrics
+
+# Transport modes:
+#   live   - talk to the real APIs
+#   record - talk to the real APIs and save every response to HTTP_FIXTURES_DIR
+#   replay - serve responses from HTTP_FIXTURES_DIR and never touch the network
+MODE_LIVE = "live"
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+
+DEFAULT_FIXTURES_DIR = "fixtures/http"
+RESPONSES_FILENAME = "responses.jsonl"
+MANIFEST_FILENAME = "manifest.json"
+DEFAULT_TIMEOUT = 30
+
+logger = logging.getLogger(__name__)
+
+_transport = None
+_transport_lock = threading.Lock()
+
+class FixtureMissingError(RuntimeError):
+    """Raised in replay mode when no recorded response matches a request."""
+
+def fixture_key(method, url, params=None) -> str:
+    """
+    Identifies a request independent of credentials, body and host data centre.
+
+    Request bodies are left out on purpose: campaign titles carry a timestamp,
+    so repeated calls to the same endpoint are told apart by call order instead.
+    """
+    parts = urlsplit(url)
+    host = parts.netloc.rsplit("@", 1)[-1]
+    if host.endswith(".api.mailchimp.com"):
+        host = "mailchimp"
+    query = parts.query
+    if params:
+        encoded = urlencode(sorted(params.items()), doseq=True)
+        query = f"{query}&{encoded}" if query else encoded
+    return f"{method.upper()} {host}{parts.path}?{query}"
+
+class LiveTransport:
+    """One shared requests.Session, so connections are pooled across calls."""
+
+    def __init__(self):
+        import requests
+        self.session = requests.Session()
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.bytes_received = 0
+        self.bytes_sent = 0
+
+    def _count(self, response):
+        with self.lock:
+            self.request_count += 1
+            self.bytes_received += len(response.content or b"")
+            body = response.request.body if response.request is not None else None
+            self.bytes_sent += len(body or b"")
+
+    def request(self, method, url, params=None, json=None, auth=None, timeout=DEFAULT_TIMEOUT):
+        response = self.session.request(method, url, params=params, json=json, auth=auth, timeout=timeout)
+        self._count(response)
+        return response
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.request_count,
+            "bytes_received": self.bytes_received,
+            "bytes_sent": self.bytes_sent,
+        }
+
+class RecordingTransport(LiveTransport):
+    """Live transport that also appends every response to a fixtures directory."""
+
+    def __init__(self, fixtures_dir):
+        super().__init__()
+        self.fixtures_dir = fixtures_dir
+        os.makedirs(fixtures_dir, exist_ok=True)
+        self.responses_path = os.path.join(fixtures_dir, RESPONSES_FILENAME)
+        # Start a fresh recording rather than mixing with an older one
+        open(self.responses_path, "w").close()
+        self._occurrences = {}
+        write_manifest(fixtures_dir, recorded_at=datetime.now(timezone.utc).isoformat())
+
+    def request(self, method, url, params=None, json=None, auth=None, timeout=DEFAULT_TIMEOUT):
+        response = super().request(method, url, params=params, json=json, auth=auth, timeout=timeout)
+        key = fixture_key(method, url, params)
+        with self.lock:
+            occurrence = self._occurrences.get(key, 0)
+            self._occurrences[key] = occurrence + 1
+            entry = {
+                "key": key,
+                "occurrence": occurrence,
+                "status": response.status_code,
+                "content_type": response.headers.get("Content-Type", ""),
+                "body_b64": base64.b64encode(response.content or b"").decode("ascii"),
+            }
+            self._append(entry)
+        return response
+
+    def _append(self, entry):
+        with open(self.responses_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+
+class ReplayTransport:
+    """Serves recorded responses in the order they were captured."""
+
+    def __init__(self, fixtures_dir):
+        self.fixtures_dir = fixtures_dir
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.bytes_received = 0
+        self._responses = {}
+        self._served = {}
+        path = os.path.join(fixtures_dir, RESPONSES_FILENAME)
+        if not os.path.exists(path):
+            raise FixtureMissingError(f"No recorded responses at '{path}'.")
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._responses.setdefault(entry["key"], []).append(entry)
+
+    def request(self, method, url, params=None, json=None, auth=None, timeout=DEFAULT_TIMEOUT):
+        key = fixture_key(method, url, params)
+        recorded = self._responses.get(key)
+        if not recorded:
+            raise FixtureMissingError(f"No recorded response for {key}")
+        with self.lock:
+            served = self._served.get(key, 0)
+            self._served[key] = served + 1
+            # Repeat the last response once a key runs out (e.g. re-polled GETs)
+            entry = recorded[min(served, len(recorded) - 1)]
+            content = base64.b64decode(entry["body_b64"])
+            self.request_count += 1
+            self.bytes_received += len(content)
+        return _build_response(method, url, entry["status"], entry["content_type"], content)
+
+    def stats(self) -> dict:
+        return {"requests": self.request_count, "bytes_received": self.bytes_received, "bytes_sent": 0}
+
+def _build_response(method, url, status, content_type, content):
+    """Wraps recorded bytes in a real requests.Response so callers see no difference."""
+    import requests
+    from requests.structures import CaseInsensitiveDict
+
+    response = requests.models.Response()
+    response.status_code = status
+    response.url = url
+    response._content = content
+    response.headers = CaseInsensitiveDict({"Content-Type": content_type})
+    response.encoding = "utf-8"
+    response.request = requests.Request(method, url).prepare()
+    return response
+
+def write_manifest(fixtures_dir, **fields):
+    """Merges fields into the fixtures manifest (e.g. the date window a recording used)."""
+    path = os.path.join(fixtures_dir, MANIFEST_FILENAME)
+    manifest = read_manifest(fixtures_dir)
+    manifest.update(fields)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=4)
+
+def read_manifest(fixtures_dir) -> dict:
+    path = os.path.join(fixtures_dir, MANIFEST_FILENAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _build_transport(mode=None, fixtures_dir=None):
+    mode = mode or os.environ.get("HTTP_MODE") or MODE_LIVE
+    fixtures_dir = fixtures_dir or os.environ.get("HTTP_FIXTURES_DIR") or DEFAULT_FIXTURES_DIR
+    logger.info("HTTP transport: %s", mode)
+    if mode == MODE_LIVE:
+        return LiveTransport()
+    if mode == MODE_RECORD:
+        return RecordingTransport(fixtures_dir)
+    if mode == MODE_REPLAY:
+        return ReplayTransport(fixtures_dir)
+    raise ValueError(f"Unknown HTTP mode '{mode}'; expected live, record or replay.")
+
+def configure(mode=None, fixtures_dir=None):
+    """
+    Selects the transport for this process. Defaults come from the HTTP_MODE
+    and HTTP_FIXTURES_DIR environment variables, falling back to live.
+    """
+    global _transport
+    transport = _build_transport(mode, fixtures_dir)
+    with _transport_lock:
+        _transport = transport
+    return transport
+
+def get_transport():
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = _build_transport()
+    return _transport
+
+def request(method, url, params=None, json=None, auth=None, timeout=DEFAULT_TIMEOUT):
+    endpoint = helpersMetrics.endpoint_label(url)
+    started = time.perf_counter()
+    status = "error"
+    try:
+        response = get_transport().request(method, url, params=params, json=json, auth=auth, timeout=timeout)
+        status = response.status_code
+        helpersMetrics.inc("http_response_bytes_total", len(response.content or b""), endpoint=endpoint)
+        return response
+    finally:
+        helpersMetrics.observe("http_request_seconds", time.perf_counter() - started, endpoint=endpoint, method=method)
+        helpersMetrics.inc("http_requests_total", endpoint=endpoint, method=method, status=status)
+
+def get(url, params=None, timeout=DEFAULT_TIMEOUT, auth=None):
+    return request("GET", url, params=params, auth=auth, timeout=timeout)
+
+def stats() -> dict:
+    """Request count and bytes moved by this process so far."""
+    return get_transport().stats()
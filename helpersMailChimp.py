@@ -1,47 +1,104 @@
 import logging
 import os
-import requests
-import sys
+import time
+
+import helpersHTTP
+from helpersSendLedger import STAGE_CREATED, STAGE_CONTENT_UPLOADED, STAGE_SENT
 
-API_KEY = os.environ['API_KEY']
-DATA_CENTRE = os.environ['DATA_CENTRE']
-AUDIENCE_ID = os.environ['AUDIENCE_ID']
 CAMPAIGN_FOLDER_ID = "5ed5be8d9a"
 
 GROUP_ID = "2012540f09"
-BASE_URL = f"https://{DATA_CENTRE}.api.mailchimp.com/3.0"
-AUTH = ("jbanystring", API_KEY)  # Mailchimp uses HTTP Basic Auth
+AUTH_USERNAME = "jbanystring"  # Mailchimp uses HTTP Basic Auth; any username works
 
 TIMEOUT  = 30
 PAGE_SIZE = 1000  # use large pages to minimize round-trips
+MAX_CONCURRENT_REQUESTS = 10  # MailChimp allows 10 simultaneous connections per user
+MAX_THROTTLE_RETRIES = 3  # 429s are safe to retry: the request was not processed
 
 DEFAULT_FROM_NAME = "Automated Reports"
 DEFAULT_REPLY_TO = "committeecorridor@parliament.uk"
 DEFAULT_SUBJECT = "Automated Committee Update"
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.ERROR)
+
+_config = None
+
+# Old module-level names, now resolved from get_config() on first access
+_LAZY_SETTINGS = {
+    "API_KEY": "api_key",
+    "DATA_CENTRE": "data_centre",
+    "AUDIENCE_ID": "audience_id",
+    "BASE_URL": "base_url",
+    "AUTH": "auth",
+}
+
+# =========================
+# CONFIGURATION
+# =========================
+
+def get_config() -> dict:
+    """
+    Reads the MailChimp settings from the environment the first time a
+    client call needs them, so importing this module has no side effects.
+
+    MAILCHIMP_BASE_URL, if set, points the helpers at a stand-in server
+    (see benchmarks/fake_mailchimp.py).
+    """
+    global _config
+    if _config is None:
+        missing = [name for name in ("API_KEY", "DATA_CENTRE", "AUDIENCE_ID") if not os.environ.get(name)]
+        if missing:
+            raise RuntimeError(f"MailChimp is not configured; set {', '.join(missing)} in the environment.")
+        data_centre = os.environ['DATA_CENTRE']
+        _config = {
+            "api_key": os.environ['API_KEY'],
+            "data_centre": data_centre,
+            "audience_id": os.environ['AUDIENCE_ID'],
+            "base_url": os.environ.get('MAILCHIMP_BASE_URL') or f"https://{data_centre}.api.mailchimp.com/3.0",
+            "auth": (AUTH_USERNAME, os.environ['API_KEY']),
+        }
+    return _config
+
+def __getattr__(name):
+    if name in _LAZY_SETTINGS:
+        return get_config()[_LAZY_SETTINGS[name]]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # =========================
 # GET, PUSH, PUT HELPERS
 # =========================
 
+class MailChimpError(RuntimeError):
+    """A MailChimp API call came back with a non-OK status (after any 429 retries)."""
+
+    def __init__(self, method, path, status_code, text):
+        super().__init__(f"{method.upper()} {path} failed with {status_code}: {text}")
+        self.status_code = status_code
+        self.text = text
+
 def mailchimp_request(method, path, payload=None, params=None):
-    url = BASE_URL + path
+    config = get_config()
+    url = config["base_url"] + path
     logger.info("Fetching: %s", url)
-    logger.debug(method, url, AUTH, payload, params or {}, TIMEOUT, sep="\n")
-    response = requests.request(
-        method,
-        url,
-        auth=AUTH,
-        json=payload,
-        params=params or {},
-        timeout=TIMEOUT,
-    )
+    for attempt in range(MAX_THROTTLE_RETRIES + 1):
+        response = helpersHTTP.request(
+            method,
+            url,
+            auth=config["auth"],
+            json=payload,
+            params=params or {},
+            timeout=TIMEOUT,
+        )
+        if response.status_code != 429 or attempt == MAX_THROTTLE_RETRIES:
+            break
+        retry_after = float(response.headers.get("Retry-After") or 2 ** attempt)
+        logger.warning(f"Throttled on {method.upper()} {path}; retrying in {retry_after:.1f}s")
+        time.sleep(retry_after)
     if not response.ok:
-        logger.debug(f"{method.upper()} {path} failed:")
+        # Raised rather than exiting, so a long-running caller (watchPipeline)
+        # can fail one committee's send and carry on with the rest
         logger.error(f"Status: {response.status_code} - Error: {response.text}")
-        sys.exit(1)
+        raise MailChimpError(method, path, response.status_code, response.text)
     return response.json() if response.content else None
 
 def mailchimp_get(path, params=None):
@@ -150,7 +207,7 @@ def fetch_all_segments(list_id):
 # =========================
 
 def list_all_tags():
-    tags = fetch_all_tags(AUDIENCE_ID)
+    tags = fetch_all_tags(get_config()["audience_id"])
     print("# TAGS (id,name)")
     print("id,name")
     for t in tags:
@@ -176,11 +233,11 @@ def list_all_campaigns():
 def list_all_groups_and_interests():
     print("# GROUPS (category_id,category_title,interest_id,interest_name)")
     print("category_id,category_title,interest_id,interest_name")
-    cats = fetch_interest_categories(AUDIENCE_ID)
+    cats = fetch_interest_categories(get_config()["audience_id"])
     for cat in cats:
         cat_id = cat.get("id")
         cat_title = (cat.get("title") or "").replace('"', '""')
-        interests = fetch_interests(AUDIENCE_ID, cat_id)
+        interests = fetch_interests(get_config()["audience_id"], cat_id)
         if not interests:
             # still output category row with blanks for interests
             print(f"{cat_id},\"{cat_title}\",,")
@@ -192,7 +249,7 @@ def list_all_groups_and_interests():
     print()
 
 def list_all_segments():
-    segs = fetch_all_segments(AUDIENCE_ID)
+    segs = fetch_all_segments(get_config()["audience_id"])
     print("# SEGMENTS (id,name,type)")
     print("id,name,type")
     for s in segs:
@@ -225,7 +282,7 @@ def check_interest_occupancy(interest_id):
     Returns the count of subscribers.
     """
 
-    path = f"/lists/{AUDIENCE_ID}/interest-categories/{GROUP_ID}/interests/{interest_id}"
+    path = f"/lists/{get_config()['audience_id']}/interest-categories/{GROUP_ID}/interests/{interest_id}"
     
     # Fetch the interest details
     interest_data = mailchimp_get(path)
@@ -255,26 +312,103 @@ def create_group_interest(name):
     :param name: The name of the interest option (e.g. "Football", "Basketball")
     """
     interest = mailchimp_post(
-        f"/lists/{AUDIENCE_ID}/interest-categories/{GROUP_ID}/interests",
+        f"/lists/{get_config()['audience_id']}/interest-categories/{GROUP_ID}/interests",
         {
             "name": name
         }
     )
     return interest
 
+def create_group_interests(names, max_workers=MAX_CONCURRENT_REQUESTS):
+    """
+    Creates several interests in the committee group concurrently.
+
+    :param names: dict of key (e.g. committee id) -> interest name. Keys,
+                  not names, identify the requests, so two keys may share a name.
+
+    Returns (created, failed): key -> created interest and key -> the
+    exception its request raised, each in the order given. One failure
+    does not stop the others.
+    """
+    created, failed = {}, {}
+    if not names:
+        return created, failed
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(names))) as pool:
+        futures = {key: pool.submit(create_group_interest, name) for key, name in names.items()}
+    for key, future in futures.items():
+        try:
+            created[key] = future.result()
+        except Exception as e:
+            logger.error(f"Creating interest '{names[key]}' failed: {e}")
+            failed[key] = e
+    return created, failed
+
 def create_and_send_weekly_email(
     interest_id, 
     campaign_title, 
     html_content, 
     subject=DEFAULT_SUBJECT, 
     from_name=DEFAULT_FROM_NAME, 
-    reply_to=DEFAULT_REPLY_TO
+    reply_to=DEFAULT_REPLY_TO,
+    ledger=None,
+    ledger_key=None
 ):
     """
     Creates a new campaign for a specific interest, 
     sets the HTML content, and sends it immediately.
+
+    If a SendLedger and key are given, each stage is recorded as it completes
+    and a previous partial attempt under the same key is resumed rather than
+    repeated. Already-sent keys are skipped.
     """
+    entry = ledger.latest(ledger_key) if ledger else None
+
+    if entry and entry["stage"] == STAGE_SENT:
+        logger.info(f"'{campaign_title}' already sent as {entry['campaign_id']}. Skipping.")
+        return entry["campaign_id"]
+
+    if entry:
+        campaign_id = entry["campaign_id"]
+        logger.info(f"Resuming campaign {campaign_id} from stage '{entry['stage']}'")
+        # The send may have gone out after the last ledger write
+        campaign = mailchimp_get(f"/campaigns/{campaign_id}")
+        if campaign and campaign.get("status") in ("sent", "sending"):
+            ledger.record(ledger_key, STAGE_SENT, campaign_id)
+            return campaign_id
+    else:
+        campaign_id = create_weekly_campaign(interest_id, campaign_title, subject, from_name, reply_to)
+        if ledger:
+            ledger.record(ledger_key, STAGE_CREATED, campaign_id, interest_id=interest_id, title=campaign_title)
+
+    # SET THE CONTENT
+    if not entry or entry["stage"] == STAGE_CREATED:
+        mailchimp_put(f"/campaigns/{campaign_id}/content", {"html": html_content})
+        logger.info(f"HTML content uploaded to {campaign_id}")
+        if ledger:
+            ledger.record(ledger_key, STAGE_CONTENT_UPLOADED, campaign_id)
+
+    # SEND the campaign
+    # This fires the email to everyone currently in that interest group
+    mailchimp_post(f"/campaigns/{campaign_id}/actions/send")
+    if ledger:
+        ledger.record(ledger_key, STAGE_SENT, campaign_id)
     
+    print(f"Success: '{campaign_title}' sent to interest {interest_id}!")
+    return campaign_id
+
+def create_weekly_campaign(
+    interest_id,
+    campaign_title,
+    subject=DEFAULT_SUBJECT,
+    from_name=DEFAULT_FROM_NAME,
+    reply_to=DEFAULT_REPLY_TO
+):
+    """
+    Creates a draft campaign targeting a single interest and returns its id.
+    """
+
     # 1. Setup the Campaign Settings
     settings = {
         "title": campaign_title,
@@ -292,7 +426,7 @@ def create_and_send_weekly_email(
     payload = {
         "type": "regular",
         "recipients": {
-            "list_id": AUDIENCE_ID,
+            "list_id": get_config()["audience_id"],
             "segment_opts": {
                 "match": "all",
                 "conditions": [
@@ -311,17 +445,6 @@ def create_and_send_weekly_email(
     campaign = mailchimp_post("/campaigns", payload)
     campaign_id = campaign["id"]
     logger.info(f"Created new campaign: {campaign_id}")
-
-    # 3. SET THE CONTENT
-    # We use the ID returned from the step above
-    mailchimp_put(f"/campaigns/{campaign_id}/content", {"html": html_content})
-    logger.info(f"HTML content uploaded to {campaign_id}")
-
-    # 4. SEND the campaign
-    # This fires the email to everyone currently in that interest group
-    mailchimp_post(f"/campaigns/{campaign_id}/actions/send")
-    
-    print(f"Success: '{campaign_title}' sent to interest {interest_id}!")
     return campaign_id
 
 # =========================
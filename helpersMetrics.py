@@ -0,0 +1,192 @@
+import json
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+import helpersFiles
+
+# In-process counters, gauges and histograms for a pipeline run, exported as
+# a JSON run report and a Prometheus textfile (node_exporter's textfile
+# collector picks up *.prom files from a directory).
+
+PREFIX = 'mcapi_'
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (1_000, 2_000, 5_000, 10_000, 20_000, 50_000, 100_000, 200_000, 500_000, 1_000_000)
+MAX_RECORDS = 5000  # per-committee/per-campaign detail kept for the JSON report
+
+# name -> (type, buckets or None, help)
+METRICS = {
+    'http_request_seconds': ('histogram', LATENCY_BUCKETS, 'HTTP request latency by endpoint.'),
+    'http_requests_total': ('counter', None, 'HTTP requests by endpoint, method and status.'),
+    'http_response_bytes_total': ('counter', None, 'Response body bytes received by endpoint.'),
+    'fetch_pages_total': ('counter', None, 'Listing pages fetched by endpoint.'),
+    'fetch_items_total': ('counter', None, 'Fetched items kept or filtered out, by endpoint.'),
+    'render_seconds': ('histogram', LATENCY_BUCKETS, 'Time to render one committee page.'),
+    'render_bytes': ('histogram', SIZE_BUCKETS, 'Size of one rendered committee page.'),
+    'render_pages_total': ('counter', None, 'Committees rendered or skipped for lack of content.'),
+    'send_seconds': ('histogram', LATENCY_BUCKETS, 'Time to create, fill and send one campaign.'),
+    'send_campaigns_total': ('counter', None, 'Campaign sends by outcome.'),
+    'seen_items_total': ('counter', None, 'Items skipped as already delivered, or marked delivered, by type.'),
+    'stage_seconds': ('gauge', None, 'Wall time of the last run of each pipeline stage.'),
+    'run_timestamp_seconds': ('gauge', None, 'Unix time the metrics were last exported.'),
+}
+
+_ID_SEGMENT = re.compile(r'^(?!\d+\.\d+$).*\d')  # has a digit, but is not a version like 3.0
+
+def endpoint_label(url: str) -> str:
+    """
+    Groups URLs by endpoint: ids in the path become {id} and the MailChimp
+    data centre is dropped, so label cardinality stays small.
+    """
+    parts = urlsplit(url)
+    host = parts.netloc.rsplit('@', 1)[-1]
+    if host.endswith('.api.mailchimp.com'):
+        host = 'mailchimp'
+    segments = ['{id}' if _ID_SEGMENT.match(s) else s for s in parts.path.split('/')]
+    return host + '/'.join(segments)
+
+def _key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+class Metrics:
+    """Thread-safe metric store; values are keyed by metric name and label set."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = {}
+            self.gauges = {}
+            self.histograms = {}
+            self.records = deque(maxlen=MAX_RECORDS)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, _key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self.gauges[(name, _key(labels))] = value
+
+    def observe(self, name: str, value: float, **labels):
+        buckets = METRICS[name][1]
+        key = (name, _key(labels))
+        with self._lock:
+            h = self.histograms.get(key)
+            if h is None:
+                h = self.histograms[key] = {'counts': [0] * len(buckets), 'count': 0, 'sum': 0.0, 'max': 0.0}
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    h['counts'][i] += 1
+                    break
+            h['count'] += 1
+            h['sum'] += value
+            h['max'] = max(h['max'], value)
+
+    def record(self, kind: str, **fields):
+        """Keeps one detail row (e.g. one committee's render) for the JSON report."""
+        with self._lock:
+            self.records.append({'kind': kind, **fields})
+
+    # --- export ---
+
+    def report(self, labels: dict = None) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+            histograms = {k: dict(v, counts=list(v['counts'])) for k, v in self.histograms.items()}
+            records = list(self.records)
+
+        def rows(values):
+            return [{'name': name, 'labels': dict(lbls), 'value': value}
+                    for (name, lbls), value in sorted(values.items())]
+
+        hist_rows = []
+        for (name, lbls), h in sorted(histograms.items()):
+            buckets = METRICS[name][1]
+            cumulative, running = {}, 0
+            for bound, n in zip(buckets, h['counts']):
+                running += n
+                cumulative[str(bound)] = running
+            hist_rows.append({
+                'name': name, 'labels': dict(lbls), 'count': h['count'], 'sum': h['sum'],
+                'mean': h['sum'] / h['count'] if h['count'] else 0.0, 'max': h['max'],
+                'buckets': cumulative,
+            })
+        return {
+            'generated_at': datetime.now(timezone.utc).isoformat(),
+            'labels': labels or {},
+            'counters': rows(counters),
+            'gauges': rows(gauges),
+            'histograms': hist_rows,
+            'records': records,
+        }
+
+    def prometheus(self, labels: dict = None) -> str:
+        """Renders every metric in the Prometheus text exposition format."""
+        const = _key(labels or {})
+        report = self.report()
+        by_name = {}
+        for kind in ('counters', 'gauges', 'histograms'):
+            for row in report[kind]:
+                by_name.setdefault(row['name'], []).append(row)
+
+        def fmt(lbls, extra=()):
+            pairs = list(const) + sorted(lbls.items()) + list(extra)
+            if not pairs:
+                return ''
+            escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+            return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+        lines = []
+        for name in sorted(by_name):
+            kind, _, help_text = METRICS[name]
+            full = PREFIX + name
+            lines.append(f'# HELP {full} {help_text}')
+            lines.append(f'# TYPE {full} {kind}')
+            for row in by_name[name]:
+                if kind == 'histogram':
+                    for bound, n in row['buckets'].items():
+                        lines.append(f"{full}_bucket{fmt(row['labels'], [('le', bound)])} {n}")
+                    lines.append(f"{full}_bucket{fmt(row['labels'], [('le', '+Inf')])} {row['count']}")
+                    lines.append(f"{full}_sum{fmt(row['labels'])} {row['sum']}")
+                    lines.append(f"{full}_count{fmt(row['labels'])} {row['count']}")
+                else:
+                    lines.append(f"{full}{fmt(row['labels'])} {row['value']}")
+        return '\n'.join(lines) + '\n'
+
+_metrics = Metrics()
+
+def inc(name: str, value: float = 1, **labels):
+    _metrics.inc(name, value, **labels)
+
+def set_gauge(name: str, value: float, **labels):
+    _metrics.set_gauge(name, value, **labels)
+
+def observe(name: str, value: float, **labels):
+    _metrics.observe(name, value, **labels)
+
+def record(kind: str, **fields):
+    _metrics.record(kind, **fields)
+
+def _write_atomic(path: str, text: str) -> None:
+    # The textfile collector must never see a partial file
+    with helpersFiles.atomic_write(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+def export(json_path: str = None, prom_path: str = None, labels: dict = None) -> None:
+    """
+    Writes the JSON run report and/or the Prometheus textfile. labels are
+    added to every exported series, e.g. {'shard': '1/4'}.
+    """
+    set_gauge('run_timestamp_seconds', time.time())
+    if json_path:
+        _write_atomic(json_path, json.dumps(_metrics.report(labels), indent=2))
+    if prom_path:
+        _write_atomic(prom_path, _metrics.prometheus(labels))
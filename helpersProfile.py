@@ -0,0 +1,137 @@
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# Opt-in profiling for the entry points (--profile DIR). Nothing here is
+# imported or started unless a profile directory is given. For each stage it
+# writes:
+#   <stage>.pstats     - cProfile stats (python -m pstats, snakeviz)
+#   <stage>.collapsed  - sampled stacks, one "frame;frame;frame count" line per
+#                        stack (flamegraph.pl, speedscope, inferno)
+#   <stage>.alloc.txt  - tracemalloc top-N allocation sites and peak memory
+
+DEFAULT_SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+DEFAULT_TOP_N = 25
+
+def add_profile_arguments(parser) -> None:
+    parser.add_argument("--profile", metavar="DIR",
+                        help="Profile the run (cProfile, sampled stacks, tracemalloc) and write reports to DIR.")
+    parser.add_argument("--profile-interval", type=float, default=DEFAULT_SAMPLE_INTERVAL * 1000,
+                        metavar="MS", help="Stack sampling interval in milliseconds (default 5).")
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+class StackSampler(threading.Thread):
+    """Samples the stacks of every other thread at a fixed interval and counts them."""
+
+    def __init__(self, interval: float = DEFAULT_SAMPLE_INTERVAL):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.interval = interval
+        self.counts = {}
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        own_id = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                key = ";".join(reversed(stack))
+                self.counts[key] = self.counts.get(key, 0) + 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def write_collapsed(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in sorted(self.counts.items()):
+                f.write(f"{stack} {count}\n")
+
+class Profiler:
+    """Profiles named stages into out_dir. Use one stage() block per stage."""
+
+    def __init__(self, out_dir: str, sample_interval: float = DEFAULT_SAMPLE_INTERVAL, top_n: int = DEFAULT_TOP_N):
+        self.out_dir = out_dir
+        self.sample_interval = sample_interval
+        self.top_n = top_n
+        os.makedirs(out_dir, exist_ok=True)
+
+    @contextmanager
+    def stage(self, name: str):
+        import cProfile
+        import tracemalloc
+
+        tracemalloc.start()
+        baseline = tracemalloc.take_snapshot()
+        sampler = StackSampler(self.sample_interval)
+        profile = cProfile.Profile()
+        sampler.start()
+        started = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            wall = time.perf_counter() - started
+            sampler.stop()
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self._write(name, wall, profile, sampler, baseline, snapshot, peak)
+
+    def _write(self, name, wall, profile, sampler, baseline, snapshot, peak):
+        import pstats
+        import tracemalloc
+
+        base = os.path.join(self.out_dir, name)
+        profile.dump_stats(f"{base}.pstats")
+        sampler.write_collapsed(f"{base}.collapsed")
+
+        # Allocations made during the stage that are still alive at its end, by line
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        stats = snapshot.filter_traces(ignore).compare_to(baseline.filter_traces(ignore), "lineno")
+        with open(f"{base}.alloc.txt", "w", encoding="utf-8") as f:
+            f.write(f"Stage {name}: wall {wall:.3f}s, peak traced memory {peak / 1024 / 1024:.1f} MiB\n")
+            f.write(f"Top {self.top_n} allocation sites by net size:\n")
+            for stat in stats[:self.top_n]:
+                f.write(f"{stat}\n")
+
+        print(f"\nProfile of {name}: {wall:.2f}s, {sampler.samples} samples, "
+              f"peak traced memory {peak / 1024 / 1024:.1f} MiB. Reports in {base}.*")
+        pstats.Stats(profile).sort_stats("cumulative").print_stats(10)
+
+def profiler_from_args(args):
+    """Returns a Profiler if --profile was given, else None."""
+    if not getattr(args, "profile", None):
+        return None
+    return Profiler(args.profile, args.profile_interval / 1000)
+
+def stage(profiler, name: str):
+    """profiler.stage(name), or a no-op when profiling is off."""
+    return profiler.stage(name) if profiler is not None else nullcontext()
+
+def run_main(main, name: str, description: str = None) -> None:
+    """
+    Runs a script's argument-less main() under --profile when asked. Used by
+    the __main__ blocks of the single-stage scripts.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description=description)
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    with stage(profiler_from_args(args), name):
+        main()
@@ -0,0 +1,129 @@
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+import helpersMetrics
+
+SEEN_STORE_FILEPATH = 'delivered_items.sqlite'
+RETENTION = timedelta(days=28)  # well past the fetch window, after which items cannot come back
+ITEM_TYPES = ('event', 'publication', 'news')
+
+class SeenStore:
+    """
+    Items already emailed to each committee, keyed on (committee id, item
+    type, item id) in a small SQLite file.
+
+    A run drops delivered items before rendering, so a second run in the
+    same week, or a drifting schedule, only sends what is genuinely new.
+    Items are marked delivered only after their committee's send succeeded.
+    Rows older than RETENTION are evicted on open.
+    """
+
+    def __init__(self, filepath: str = SEEN_STORE_FILEPATH, retention: timedelta = RETENTION):
+        import sqlite3
+
+        self.filepath = filepath
+        self.retention = retention
+        self._lock = threading.Lock()
+        # Shards may share the file; wait for each other's writes rather than fail
+        self._conn = sqlite3.connect(filepath, timeout=30, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS delivered ("
+                "cttee_id INTEGER NOT NULL, item_type TEXT NOT NULL, item_id TEXT NOT NULL, "
+                "delivered_at TEXT NOT NULL, PRIMARY KEY (cttee_id, item_type, item_id)) WITHOUT ROWID")
+        self.evict()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def evict(self, now: datetime = None) -> int:
+        """Deletes rows delivered more than retention ago. Returns how many."""
+        cutoff = (now or datetime.now(timezone.utc)) - self.retention
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM delivered WHERE delivered_at < ?", (cutoff.isoformat(),)).rowcount
+
+    def delivered(self, cttee_ids=None) -> set:
+        """Returns {(cttee_id, item_type, item_id)} already delivered, optionally for some committees only."""
+        with self._lock:
+            rows = self._conn.execute("SELECT cttee_id, item_type, item_id FROM delivered").fetchall()
+        if cttee_ids is None:
+            return set(rows)
+        wanted = {int(c) for c in cttee_ids}
+        return {row for row in rows if row[0] in wanted}
+
+    def filter_undelivered(self, data: dict) -> tuple:
+        """
+        Returns (data without items already delivered to their committee,
+        number of items dropped per type).
+
+        Joint events keep only the committees that have not had them yet, so
+        each committee's page still gets exactly its new items.
+        """
+        delivered = self.delivered()
+        dropped = dict.fromkeys(ITEM_TYPES, 0)
+
+        events = []
+        for e in data.get('events', []):
+            committees = [c for c in e.get('committees', [])
+                          if (c.get('id'), 'event', str(e.get('id'))) not in delivered]
+            dropped['event'] += len(e.get('committees', [])) - len(committees)
+            if committees:
+                events.append(dict(e, committees=committees) if len(committees) != len(e.get('committees', [])) else e)
+
+        publications = []
+        for p in data.get('publications', []):
+            if (p.get('committee', {}).get('id'), 'publication', str(p.get('id'))) in delivered:
+                dropped['publication'] += 1
+            else:
+                publications.append(p)
+
+        news = []
+        for n in data.get('news', []):
+            if (n.get('source_committee_id'), 'news', str(n.get('id'))) in delivered:
+                dropped['news'] += 1
+            else:
+                news.append(n)
+
+        for item_type, n in dropped.items():
+            helpersMetrics.inc('seen_items_total', n, item_type=item_type, outcome='skipped')
+        return dict(data, events=events, publications=publications, news=news), dropped
+
+    def mark_delivered(self, cttee_id, items, now: datetime = None) -> None:
+        """Records [(item_type, item_id)] as delivered to cttee_id."""
+        stamp = (now or datetime.now(timezone.utc)).isoformat()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO delivered VALUES (?, ?, ?, ?)",
+                [(int(cttee_id), item_type, str(item_id), stamp) for item_type, item_id in items])
+        for item_type, _ in items:
+            helpersMetrics.inc('seen_items_total', item_type=item_type, outcome='marked')
+
+    def mark_sent(self, page_items: dict, outcomes: dict) -> int:
+        """
+        Marks the items of every committee whose outcome is 'sent' as
+        delivered. page_items is {cttee_id: [(item_type, item_id), ...]}, the
+        items each sent page actually contained (see generate_htmls). Returns
+        the number of items recorded.
+        """
+        count = 0
+        for cttee_id, outcome in outcomes.items():
+            items = page_items.get(int(cttee_id), [])
+            if outcome == 'sent' and items:
+                self.mark_delivered(cttee_id, items)
+                count += len(items)
+        return count
+
+def report_dropped(dropped: dict) -> None:
+    if any(dropped.values()):
+        print("Skipping already-delivered items: " + ", ".join(f"{n} {t}" for t, n in dropped.items() if n))
+
+def enabled() -> bool:
+    """De-duplication is on unless SEEN_STORE=0 is set in the environment."""
+    return os.environ.get('SEEN_STORE', '1') != '0'
@@ -0,0 +1,93 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+
+SEND_LEDGER_FILEPATH = 'send_ledger.jsonl'
+
+# Stages a campaign passes through, in order
+STAGE_CREATED = "created"
+STAGE_CONTENT_UPLOADED = "content_uploaded"
+STAGE_SENT = "sent"
+STAGES = (STAGE_CREATED, STAGE_CONTENT_UPLOADED, STAGE_SENT)
+
+logger = logging.getLogger(__name__)
+
+def current_week(now=None) -> str:
+    """Returns the ISO week the send belongs to, e.g. '2026-W10'."""
+    now = now or datetime.now(timezone.utc)
+    year, week, _ = now.isocalendar()
+    return f"{year}-W{week:02d}"
+
+def content_hash(html_content) -> str:
+    """SHA-256 of the email body, so changed content is treated as a new send."""
+    if isinstance(html_content, str):
+        html_content = html_content.encode('utf-8')
+    return hashlib.sha256(html_content).hexdigest()
+
+class SendLedger:
+    """
+    Append-only record of campaign progress, keyed by committee, week and
+    content hash.
+
+    Every stage is written as one JSON line and fsynced before the next API
+    call is made, so a run that dies partway can be rerun safely: finished
+    sends are skipped and half-finished campaigns are resumed by id.
+    """
+
+    def __init__(self, filepath: str = SEND_LEDGER_FILEPATH):
+        self.filepath = filepath
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def make_key(cttee_id, html_content, week: str = None) -> str:
+        return f"{cttee_id}:{week or current_week()}:{content_hash(html_content)[:16]}"
+
+    def _load(self):
+        if not os.path.exists(self.filepath):
+            return
+        with open(self.filepath, 'r', encoding='utf-8') as f:
+            for line_no, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash mid-write can leave a torn final line; ignore it
+                    logger.warning("Ignoring unreadable ledger line %d in %s", line_no, self.filepath)
+                    continue
+                previous = self._entries.get(entry["key"])
+                if previous is None or STAGES.index(entry["stage"]) >= STAGES.index(previous["stage"]):
+                    self._entries[entry["key"]] = entry
+
+    def latest(self, key: str):
+        """Returns the most advanced entry recorded for key, or None."""
+        return self._entries.get(key)
+
+    def is_sent(self, key: str) -> bool:
+        entry = self.latest(key)
+        return entry is not None and entry["stage"] == STAGE_SENT
+
+    def record(self, key: str, stage: str, campaign_id: str, **extra) -> dict:
+        """Appends a stage transition and flushes it to disk."""
+        if stage not in STAGES:
+            raise ValueError(f"Unknown ledger stage: {stage}")
+        entry = {
+            "key": key,
+            "stage": stage,
+            "campaign_id": campaign_id,
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+            **extra,
+        }
+        with self._lock:
+            with open(self.filepath, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._entries[key] = entry
+        return entry
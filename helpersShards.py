@@ -0,0 +1,143 @@
+import json
+import os
+import zlib
+
+import helpersFiles
+
+SHARDS_DIR = 'shards'
+LISTINGS_FILE = 'listings.json'  # shared Events/Publications, inside SHARDS_DIR
+REPORT_FILE = 'report.json'
+
+def parse_shard(value: str) -> tuple:
+    """
+    Parses "i/N" into (i, N), with shards numbered 1..N.
+
+    Raises ValueError on anything else.
+    """
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise ValueError(f"Shard must look like i/N, got '{value}'.")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Shard index must be between 1 and N, got '{value}'.")
+    return index, count
+
+def shard_for(cttee_id, count: int) -> int:
+    """
+    Returns the shard (1..count) a committee belongs to.
+
+    Uses CRC32 of the id rather than hash(), which is salted per process, so
+    every worker agrees on the assignment.
+    """
+    return zlib.crc32(str(int(cttee_id)).encode('ascii')) % count + 1
+
+def shard_rows(registry, index: int, count: int) -> list:
+    """The registry's rows that belong to shard index of count, in mapping order."""
+    return [row for row in registry if shard_for(row.cttee_id, count) == index]
+
+def shard_dir(index: int, count: int) -> str:
+    return os.path.join(SHARDS_DIR, f"{index}-of-{count}")
+
+def listings_path() -> str:
+    return os.path.join(SHARDS_DIR, LISTINGS_FILE)
+
+def _write_json(path: str, value) -> None:
+    with helpersFiles.atomic_write(path, 'w', encoding='utf-8') as f:
+        json.dump(value, f, indent=4)
+
+def save_listings(listings: dict) -> str:
+    path = listings_path()
+    _write_json(path, listings)
+    return path
+
+def load_listings():
+    """Returns the shared listings saved by the prefetch step, or None."""
+    try:
+        with open(listings_path(), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def load_shard_report(index: int, count: int) -> dict:
+    """Returns the shard's report so far, or {} if it has none."""
+    try:
+        with open(os.path.join(shard_dir(index, count), REPORT_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def update_shard_report(index: int, count: int, changes: dict) -> str:
+    """
+    Merges changes into the shard's report, so a shard whose stages run as
+    separate invocations still ends up with one report. Timings are merged
+    per stage; other keys are replaced. A report for a different window is
+    left over from an earlier run and is started afresh.
+    """
+    report = load_shard_report(index, count)
+    if 'window' in changes and report.get('window') not in (None, changes['window']):
+        report = {}
+    timings = report.get('timings', {})
+    timings.update(changes.pop('timings', {}))
+    report.update(changes, shard=f"{index}/{count}", timings=timings)
+    path = os.path.join(shard_dir(index, count), REPORT_FILE)
+    _write_json(path, report)
+    return path
+
+def load_shard_reports(count: int) -> tuple:
+    """
+    Reads the report of every shard of count.
+
+    Returns (reports in shard order, list of missing shard indexes).
+    """
+    reports = []
+    missing = []
+    for index in range(1, count + 1):
+        path = os.path.join(shard_dir(index, count), REPORT_FILE)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                reports.append(json.load(f))
+        except FileNotFoundError:
+            missing.append(index)
+    return reports, missing
+
+def merge_reports(reports: list, count: int) -> dict:
+    """
+    Combines shard reports into one run report. Wall time is the slowest
+    shard, as shards run side by side.
+    """
+    outcomes = {}
+    pages = []
+    stage_seconds = {}
+    for report in reports:
+        outcomes.update(report.get('outcomes', {}))
+        pages.extend(report.get('pages', []))
+        for stage, seconds in report.get('timings', {}).items():
+            stage_seconds.setdefault(stage, []).append(seconds)
+
+    totals = {}
+    for outcome in outcomes.values():
+        totals[outcome] = totals.get(outcome, 0) + 1
+
+    return {
+        'shards': count,
+        'window': reports[0].get('window') if reports else None,
+        'committees': sum(len(report.get('committees', [])) for report in reports),
+        'pages': len(pages),
+        'outcomes': totals,
+        'wall_seconds': max((sum(r.get('timings', {}).values()) for r in reports), default=0.0),
+        'stage_seconds': {stage: {'max': max(v), 'total': sum(v)} for stage, v in stage_seconds.items()},
+        'per_shard': [
+            {
+                'shard': report['shard'],
+                'committees': len(report.get('committees', [])),
+                'pages': len(report.get('pages', [])),
+                'timings': report.get('timings', {}),
+            }
+            for report in reports
+        ],
+    }
+
+def save_merged_report(report: dict) -> str:
+    path = os.path.join(SHARDS_DIR, REPORT_FILE)
+    _write_json(path, report)
+    return path
@@ -0,0 +1,290 @@
+"""
+Runs the weekly pipeline (fetch -> render -> send) in a single process.
+
+Fetched data and rendered pages are handed from stage to stage in memory,
+and every HTTP call goes through the one pooled session in helpersHTTP.
+Running a subset picks up the previous stage's artefacts from disk:
+
+    python runPipeline.py                              # fetch, render and send
+    python runPipeline.py --persist json,html          # also write parliament_data.json and docs/
+    python runPipeline.py --stages render,send         # start from the saved parliament_data.json
+
+A send-only run sends just the pages listed in rendered_pages.json, which
+the last render wrote, not every page left in docs/HTMLs.
+
+Sharded runs split the committees across N workers by committee id. The
+Events and Publications listings are fetched once and shared, each worker
+handles its own committees, and a merge rebuilds docs/index.html and a
+combined report (shards/report.json). Workers need a shared working
+directory:
+
+    python runPipeline.py --prefetch                   # once, writes shards/listings.json
+    python runPipeline.py --shard 1/4 --persist html   # on each worker, 1/4 .. 4/4
+    python runPipeline.py --merge 4                    # once all shards have finished
+
+--metrics DIR writes a JSON run report and a Prometheus textfile (for
+node_exporter's textfile collector) with per-endpoint latency, pages and
+bytes fetched, items kept and filtered, render time and size per committee
+and send outcomes per campaign.
+
+--profile DIR profiles each stage separately (see helpersProfile).
+
+Items already emailed to a committee in an earlier run are left out of its
+page (delivered_items.sqlite); --no-dedupe renders and sends the full window.
+
+Every house with a mapping file (mapping.csv for the Commons,
+mapping_lords.csv, mapping_joint.csv) is covered in the one run: the houses'
+listings are fetched concurrently, and their committees are rendered and
+sent together. --houses (or PIPELINE_HOUSES) narrows it:
+
+    python runPipeline.py --houses Commons,Lords
+"""
+import argparse
+import json
+import os
+import time
+
+import helpersCSVMapping
+import helpersMetrics
+import helpersProfile
+import helpersSeenStore
+import helpersShards
+
+STAGES = ('fetch', 'render', 'send')
+ARTEFACTS = ('json', 'html')
+METRICS_REPORT_FILE = 'run_report.json'
+METRICS_PROM_FILE = 'mcapi.prom'
+
+def _parse_list(value: str, allowed: tuple, what: str) -> list:
+    items = [v.strip() for v in value.split(',') if v.strip()] if value else []
+    unknown = [v for v in items if v not in allowed]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"Unknown {what}: {', '.join(unknown)} (choose from {', '.join(allowed)})")
+    return items
+
+def _parse_shard(value: str) -> tuple:
+    try:
+        return helpersShards.parse_shard(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def run(stages=STAGES, persist=(), shard=None, profiler=None, dedupe=True, houses=None) -> dict:
+    """
+    Runs the requested stages in order and returns {stage: seconds}.
+
+    Args:
+        stages  : Any of 'fetch', 'render', 'send'.
+        persist : Any of 'json' (parliament_data.json) and 'html' (docs/HTMLs and docs/index.html).
+        shard   : (i, N) to handle only shard i of N. The shard's JSON and
+                  report go to shards/<i>-of-<N>/ and the index is left to the merge.
+        profiler: A helpersProfile.Profiler to profile each stage separately.
+        dedupe  : Drop items already delivered to their committee before
+                  rendering, and record what was sent (helpersSeenStore).
+        houses  : The houses to cover; default every house with a mapping.
+    """
+    timings = {}
+    registry = helpersCSVMapping.get_pipeline_registry(houses)
+    if not registry.exists:
+        print(f"Error: {registry.filepath} not found.")
+        return timings
+
+    rows = list(registry) if shard is None else helpersShards.shard_rows(registry, *shard)
+    json_file = None
+    manifest_file = None
+    if shard is not None:
+        os.makedirs(helpersShards.shard_dir(*shard), exist_ok=True)
+        json_file = os.path.join(helpersShards.shard_dir(*shard), 'parliament_data.json')
+        manifest_file = os.path.join(helpersShards.shard_dir(*shard), 'rendered_pages.json')
+        print(f"Shard {shard[0]}/{shard[1]}: {len(rows)} of {len(registry)} committees.")
+
+    data = None
+    pages = None
+    outcomes = {}
+    store = None
+    if dedupe and ('render' in stages or 'send' in stages):
+        store = helpersSeenStore.SeenStore()
+
+    if 'fetch' in stages:
+        import fetch_parliament_data
+        with helpersProfile.stage(profiler, 'fetch'):
+            started = time.perf_counter()
+            listings = None
+            if shard is not None:
+                listings = helpersShards.load_listings()
+                if listings is None:
+                    print(f"Warning: {helpersShards.listings_path()} not found; fetching listings for this shard alone.")
+                elif not fetch_parliament_data.in_current_window(listings["metadata"]["extracted_at"]):
+                    print(f"Warning: {helpersShards.listings_path()} was fetched {listings['metadata']['extracted_at']}, "
+                          f"outside the current window; fetching listings for this shard alone.")
+                    listings = None
+                elif listings["metadata"].get("houses", ['Commons']) != registry.houses:
+                    print(f"Warning: {helpersShards.listings_path()} covers {listings['metadata'].get('houses', ['Commons'])}, "
+                          f"not {registry.houses}; fetching listings for this shard alone.")
+                    listings = None
+            data = fetch_parliament_data.fetch_data({row.cttee_id for row in rows}, listings=listings,
+                                                    houses=registry.houses)
+            if 'json' in persist:
+                fetch_parliament_data.save_data(data, json_file or fetch_parliament_data.JSON_FILE)
+            timings['fetch'] = time.perf_counter() - started
+
+    if 'render' in stages:
+        import generate_htmls
+        with helpersProfile.stage(profiler, 'render'):
+            started = time.perf_counter()
+            if data is None:
+                with open(json_file or generate_htmls.JSON_FILE, 'r') as f:
+                    data = json.load(f)
+            committees_map = {str(row.cttee_id): row.cttee_name for row in rows}
+            # The feeds list everything, including what earlier runs emailed
+            feeds = generate_htmls.committee_feeds(data, committees_map) if 'html' in persist else []
+            extracted_at = data['metadata'].get('extracted_at')
+            if store is not None:
+                data, dropped = store.filter_undelivered(data)
+                helpersSeenStore.report_dropped(dropped)
+            pages = generate_htmls.render_pages(data, committees_map)
+            if 'html' in persist:
+                generate_htmls.write_pages(pages, index=shard is None,
+                                           manifest_file=manifest_file or generate_htmls.PAGES_MANIFEST_FILE)
+                generate_htmls.write_feeds(feeds, extracted_at, index=shard is None)
+            timings['render'] = time.perf_counter() - started
+
+    if 'send' in stages:
+        import sendUpdates
+        with helpersProfile.stage(profiler, 'send'):
+            started = time.perf_counter()
+            if pages is None:
+                page_map = sendUpdates.load_pages(rows, manifest_file)
+            else:
+                page_map = {int(page['id']): page['html'] for page in pages}
+            outcomes = sendUpdates.send_pages(page_map, rows)
+            if store is not None:
+                page_items = None if pages is None else {int(page['id']): page['items'] for page in pages}
+                sendUpdates.mark_delivered(store, outcomes, page_items, manifest_file)
+            timings['send'] = time.perf_counter() - started
+
+    if store is not None:
+        store.close()
+
+    for stage, seconds in timings.items():
+        helpersMetrics.set_gauge('stage_seconds', seconds, stage=stage)
+
+    if shard is not None:
+        changes = {'committees': [row.cttee_id for row in rows], 'timings': timings}
+        if data is not None:
+            changes['window'] = data['metadata']['range']
+        if pages is not None:
+            changes['pages'] = [{key: page[key] for key in ('id', 'name', 'filename')} for page in pages]
+        if 'send' in stages:
+            changes['outcomes'] = {str(cttee_id): outcome for cttee_id, outcome in outcomes.items()}
+        helpersShards.update_shard_report(*shard, changes)
+
+    return timings
+
+def prefetch(houses=None) -> None:
+    """Fetches the shared Events and Publications listings for the shards."""
+    import fetch_parliament_data
+    listings = fetch_parliament_data.fetch_listings(houses=helpersCSVMapping.configured_houses(houses))
+    path = helpersShards.save_listings(listings)
+    print(f"Saved {len(listings['events'])} events and {len(listings['publications'])} publications to {path}")
+
+def merge(count: int, houses=None) -> bool:
+    """
+    Rebuilds docs/index.html from every shard's pages and writes the combined
+    report. Returns False, changing nothing, if any shard has not reported,
+    or has only a report from an earlier window, or the shards disagree on
+    the window.
+    """
+    import fetch_parliament_data
+
+    reports, missing = helpersShards.load_shard_reports(count)
+    if missing:
+        print(f"Error: no report yet from shard(s) {', '.join(f'{i}/{count}' for i in missing)}.")
+        return False
+    stale = [report['shard'] for report in reports
+             if not report.get('window') or not fetch_parliament_data.in_current_window(report['window'][1])]
+    if stale:
+        print(f"Error: shard(s) {', '.join(stale)} have not reported for the current window.")
+        return False
+    windows = {tuple(report['window']) for report in reports}
+    if len(windows) > 1:
+        described = ', '.join(f"{r['shard']} {r['window'][0]}..{r['window'][1]}" for r in reports)
+        print(f"Error: shards report different windows: {described}.")
+        return False
+
+    import generate_htmls
+    registry = helpersCSVMapping.get_pipeline_registry(houses)
+    position = {row.cttee_id: n for n, row in enumerate(registry)}
+    pages = [page for report in reports for page in report.get('pages', [])]
+    pages.sort(key=lambda page: position.get(int(page['id']), len(position)))
+    if pages:
+        os.makedirs(os.path.dirname(generate_htmls.INDEX_FILE), exist_ok=True)
+        with open(generate_htmls.INDEX_FILE, 'wb') as f:
+            f.write(generate_htmls.render_index(pages))
+        print(f"Generated Index: {generate_htmls.INDEX_FILE} ({len(pages)} pages)")
+    generate_htmls.write_feed_index()
+
+    report = helpersShards.merge_reports(reports, count)
+    path = helpersShards.save_merged_report(report)
+    print(f"Merged {count} shards: {report['committees']} committees, {report['pages']} pages, "
+          f"outcomes {report['outcomes']}, slowest shard {report['wall_seconds']:.2f}s. Report: {path}")
+    return True
+
+def export_metrics(directory: str, shard=None) -> None:
+    """Writes the run's metrics to directory; shards get their own files and a shard label."""
+    labels = {}
+    report_file, prom_file = METRICS_REPORT_FILE, METRICS_PROM_FILE
+    if shard is not None:
+        labels['shard'] = f"{shard[0]}/{shard[1]}"
+        suffix = f"_shard{shard[0]}of{shard[1]}"
+        report_file = report_file.replace('.json', f"{suffix}.json")
+        prom_file = prom_file.replace('.prom', f"{suffix}.prom")
+    helpersMetrics.export(os.path.join(directory, report_file), os.path.join(directory, prom_file), labels)
+    print(f"Metrics written to {directory}")
+
+def print_timings(timings: dict) -> None:
+    if not timings:
+        return
+    print("\nStage timings:")
+    for stage, seconds in timings.items():
+        print(f"  {stage:<8} {seconds:8.2f}s")
+    print(f"  {'total':<8} {sum(timings.values()):8.2f}s")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the committee update pipeline in one process.")
+    parser.add_argument("--stages", default=",".join(STAGES),
+                        type=lambda v: _parse_list(v, STAGES, "stage"),
+                        help="Comma-separated stages to run (default: fetch,render,send).")
+    parser.add_argument("--persist", default="",
+                        type=lambda v: _parse_list(v, ARTEFACTS, "artefact"),
+                        help="Comma-separated artefacts to write: json, html.")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--shard", type=_parse_shard, metavar="i/N",
+                      help="Handle only shard i of N (committees split by id).")
+    mode.add_argument("--prefetch", action="store_true",
+                      help="Fetch the listings shared by all shards and exit.")
+    mode.add_argument("--merge", type=int, metavar="N",
+                      help="Merge the reports of N shards and rebuild docs/index.html.")
+    parser.add_argument("--metrics", metavar="DIR",
+                        help="Write a JSON run report and a Prometheus textfile to DIR.")
+    parser.add_argument("--no-dedupe", action="store_true",
+                        help="Render and send every item in the window, even ones already delivered.")
+    parser.add_argument("--houses", default=None,
+                        type=lambda v: _parse_list(v, helpersCSVMapping.HOUSES, "house"),
+                        help="Comma-separated houses to cover (default: every house with a mapping file).")
+    helpersProfile.add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.prefetch:
+        prefetch(args.houses)
+    elif args.merge:
+        if not merge(args.merge, args.houses):
+            raise SystemExit(1)
+    else:
+        timings = run(args.stages, args.persist, args.shard, helpersProfile.profiler_from_args(args),
+                      dedupe=not args.no_dedupe and helpersSeenStore.enabled(), houses=args.houses)
+        print_timings(timings)
+        if args.metrics:
+            export_metrics(args.metrics, args.shard)
+
+if __name__ == "__main__":
+    main()
@@ -1,59 +1,139 @@
 from datetime import datetime
+import json
+import logging
 import os
+import time
 
-from helpersCSVMapping import *
-from helpersMailChimp import *
+import helpersMetrics
+import helpersSeenStore
+from helpersCSVMapping import get_pipeline_registry
+from helpersMailChimp import (
+    DEFAULT_FROM_NAME,
+    DEFAULT_REPLY_TO,
+    DEFAULT_SUBJECT,
+    check_interest_occupancy,
+    create_and_send_weekly_email,
+)
+from helpersSendLedger import SendLedger
 
-MAPPING_FILE = 'mapping.csv'
-HTMLS_DIR = 'HTMLs'
+logger = logging.getLogger(__name__)
 
-def main():
-    if not os.path.exists(MAPPING_CSV_FILEPATH):
-        print(f"Error: {MAPPING_CSV_FILEPATH} not found.")
-        return
+HTMLS_DIR = 'docs/HTMLs'  # where generate_htmls writes the pages
+PAGES_MANIFEST_FILE = 'rendered_pages.json'  # ... and lists the ones its last run rendered
 
-    with open(MAPPING_CSV_FILEPATH, mode='r', encoding='utf-8') as f:
-        reader = csv.reader(f)
-        next(reader)  # Skip the header row
-        
-        for row in reader:
-            # Ensure row has enough columns (Cttee ID, Name, Campaign ID)
-            if not row or len(row) < 3:
-                continue
-            
-            cttee_id = row[0].strip()
-            cttee_name = row[1].strip()
-            interest_id = row[2].strip()
+def _load_manifest(manifest_file: str = None) -> list:
+    manifest_file = manifest_file or PAGES_MANIFEST_FILE
+    try:
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            return json.load(f)['pages']
+    except FileNotFoundError:
+        logger.warning("No %s; render the pages before sending them.", manifest_file)
+        return []
+
+def load_page_items(manifest_file: str = None) -> dict:
+    """{cttee_id: [(item_type, item_id), ...]} for the pages the last render listed."""
+    return {int(page['id']): [tuple(item) for item in page.get('items', [])]
+            for page in _load_manifest(manifest_file)}
 
+def load_pages(registry, manifest_file: str = None) -> dict:
+    """
+    Reads the pages the last render listed in its manifest, for the mapped
+    committees. Older pages left in HTMLS_DIR are never sent.
+    """
+    listed = _load_manifest(manifest_file)
+    mapped = {row.cttee_id for row in registry}
+    pages = {}
+    for page in listed:
+        if int(page['id']) in mapped:
+            with open(os.path.join(HTMLS_DIR, page['filename']), 'r', encoding='utf-8') as hf:
+                pages[int(page['id'])] = hf.read()
+    return pages
+
+def send_pages(pages: dict, registry) -> dict:
+    """
+    Sends each committee's page to its interest group.
+
+    Args:
+        pages    : Committee id (int) -> HTML (str or UTF-8 bytes).
+        registry : The MappingRegistry (or any iterable of its rows) to send for.
+
+    Returns committee id -> 'sent', 'error' or 'no_content'.
+    """
+    outcomes = {}
+    # Survives crashes so a rerun skips or resumes campaigns already started
+    ledger = SendLedger()
+
+    for cttee_id, cttee_name, interest_id in registry:
+        try:
             if check_interest_occupancy(interest_id)==0:
                 logger.info(f"No contacts found for this interest so nobody to send to. Skipping.")
+        except Exception as e:
+            logger.warning(f"Could not check the contacts of interest {interest_id}: {e}")
 
-            date_and_time = str(datetime.today())[0:16]
-            campaign_title = f"{cttee_name} {date_and_time}"
-            
-            # Check if an HTML file exists for this committee
-            html_file_path = os.path.join(HTMLS_DIR, f"{cttee_id}.html")
+        date_and_time = str(datetime.today())[0:16]
+        campaign_title = f"{cttee_name} {date_and_time}"
+        
+        # Check if a page was rendered for this committee
+        html_body = pages.get(cttee_id)
+        
+        if html_body is not None:
+            print(f"Found content for Committee {cttee_id}. Preparing to send...")
+            if isinstance(html_body, bytes):
+                html_body = html_body.decode('utf-8')
             
-            if os.path.exists(html_file_path):
-                print(f"Found content for Committee {cttee_id}. Preparing to send...")
-                
-                with open(html_file_path, 'r', encoding='utf-8') as hf:
-                    html_body = hf.read()
-                
-                try:
-                    create_and_send_weekly_email(
-                        interest_id, 
-                        campaign_title, 
-                        html_body, 
-                        subject=DEFAULT_SUBJECT, 
-                        from_name=DEFAULT_FROM_NAME, 
-                        reply_to=DEFAULT_REPLY_TO
-                    )
-                except Exception as e:
-                    print(f"Error sending campaign for committee {cttee_id}: {e}")
-            else:
-                # If no HTML file was created by the previous script (no new data), we skip
-                print(f"No new updates for Committee {cttee_id} (No HTML file). Skipping.")
+            started = time.perf_counter()
+            campaign_id = None
+            try:
+                campaign_id = create_and_send_weekly_email(
+                    interest_id, 
+                    campaign_title, 
+                    html_body, 
+                    subject=DEFAULT_SUBJECT, 
+                    from_name=DEFAULT_FROM_NAME, 
+                    reply_to=DEFAULT_REPLY_TO,
+                    ledger=ledger,
+                    ledger_key=SendLedger.make_key(cttee_id, html_body)
+                )
+                outcomes[cttee_id] = 'sent'
+            except Exception as e:
+                print(f"Error sending campaign for committee {cttee_id}: {e}")
+                outcomes[cttee_id] = 'error'
+            elapsed = time.perf_counter() - started
+            helpersMetrics.observe('send_seconds', elapsed)
+            helpersMetrics.record('send', cttee_id=cttee_id, interest_id=interest_id, campaign_id=campaign_id,
+                                  outcome=outcomes[cttee_id], seconds=elapsed)
+        else:
+            # If no page was created by the previous stage (no new data), we skip
+            print(f"No new updates for Committee {cttee_id} (No HTML file). Skipping.")
+            outcomes[cttee_id] = 'no_content'
+
+        helpersMetrics.inc('send_campaigns_total', outcome=outcomes[cttee_id])
+
+    return outcomes
+
+def mark_delivered(store, outcomes: dict, page_items: dict = None, manifest_file: str = None) -> None:
+    """
+    Records the items on every successfully sent page in the seen store.
+    page_items is {cttee_id: [(item_type, item_id), ...]}; without it they
+    are read from the render's manifest.
+    """
+    if page_items is None:
+        page_items = load_page_items(manifest_file)
+    count = store.mark_sent(page_items, outcomes)
+    logger.info(f"Recorded {count} delivered items.")
+
+def main():
+    registry = get_pipeline_registry()
+    if not registry.exists:
+        print(f"Error: {registry.filepath} not found.")
+        return
+
+    outcomes = send_pages(load_pages(registry), registry)
+    if helpersSeenStore.enabled():
+        with helpersSeenStore.SeenStore() as store:
+            mark_delivered(store, outcomes)
 
 if __name__ == "__main__":
-    main()
+    import helpersProfile
+    logging.basicConfig(level=logging.ERROR)
+    helpersProfile.run_main(main, "send", "Send the rendered pages to their MailChimp interests.")
@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta, timezone
+
+import fetch_parliament_data
+import helpersHTTP
+
+
+def test_date_window_spans_window_days():
+    as_of = datetime(2026, 3, 3, 12, tzinfo=timezone.utc)
+    today, start = fetch_parliament_data.date_window(as_of)
+    assert today == as_of
+    assert today - start == timedelta(days=fetch_parliament_data.WINDOW_DAYS)
+
+
+def test_naive_pipeline_as_of_is_utc(monkeypatch):
+    monkeypatch.setenv('PIPELINE_AS_OF', '2026-03-03T12:00:00')
+    today, start = fetch_parliament_data.date_window()
+    assert today == datetime(2026, 3, 3, 12, tzinfo=timezone.utc)
+    assert start.tzinfo is not None
+
+
+def test_in_current_window(monkeypatch):
+    monkeypatch.setenv('PIPELINE_AS_OF', '2026-03-03')
+    assert fetch_parliament_data.in_current_window('2026-03-03T23:00:00+00:00')
+    assert fetch_parliament_data.in_current_window('2026-02-25')
+    assert not fetch_parliament_data.in_current_window('2026-02-24')
+    assert not fetch_parliament_data.in_current_window('2026-03-04')
+
+
+class _Response:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+def test_news_filter_compares_with_a_naive_pipeline_as_of(monkeypatch):
+    monkeypatch.setenv('PIPELINE_AS_OF', '2026-03-03')
+    items = [{'value': {'id': 1, 'datePublished': '2026-03-01T09:00:00Z'}},
+             {'value': {'id': 2, 'datePublished': '2026-02-01T09:00:00+00:00'}}]
+    monkeypatch.setattr(helpersHTTP, 'get', lambda url, params=None: _Response({'items': items}))
+    _, since = fetch_parliament_data.date_window()
+    kept = fetch_parliament_data.fetch_all_pages('https://example.invalid/news/', {}, 'datePublished', since)
+    assert [item['id'] for item in kept] == [1]
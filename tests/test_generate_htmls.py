@@ -0,0 +1,100 @@
+import json
+
+import pytest
+
+import generate_htmls
+from generate_htmls import _feed_date, _merge_feed_items
+
+SEEN_AT = '2026-03-03T12:00:00+00:00'
+
+
+def item(item_id, published, title='Title', seen_at=SEEN_AT):
+    return {'id': f"urn:test:{item_id}", 'url': None, 'title': title, 'summary': None,
+            'date_published': published, 'tags': ['news'], '_seen_at': seen_at}
+
+
+def test_feed_date_is_utc():
+    assert _feed_date('2026-01-10T10:00:00') == '2026-01-10T10:00:00+00:00'
+    assert _feed_date('2026-07-01T10:00:00') == '2026-07-01T09:00:00+00:00'
+    assert _feed_date('2026-07-01T10:00:00Z') == '2026-07-01T10:00:00+00:00'
+    assert _feed_date(None, 'fallback') == 'fallback'
+
+
+def test_merge_adds_new_items_newest_first():
+    items, changed = _merge_feed_items([], [item(1, '2026-03-01T00:00:00+00:00'), item(2, '2026-03-02T00:00:00+00:00')])
+    assert changed
+    assert [i['id'] for i in items] == ['urn:test:2', 'urn:test:1']
+    assert items[0]['date_modified'] == items[0]['date_published']
+    assert '_seen_at' not in items[0]
+
+
+def test_merge_of_the_same_items_changes_nothing():
+    existing, _ = _merge_feed_items([], [item(1, '2026-03-01T00:00:00+00:00')])
+    items, changed = _merge_feed_items(json.loads(json.dumps(existing)), [item(1, '2026-03-01T00:00:00+00:00')])
+    assert not changed
+    assert items == existing
+
+
+def test_merge_moves_date_modified_when_content_changes():
+    existing, _ = _merge_feed_items([], [item(1, '2026-03-01T00:00:00+00:00')])
+    items, changed = _merge_feed_items(existing, [item(1, '2026-03-01T00:00:00+00:00', title='New title')])
+    assert changed
+    assert items[0]['title'] == 'New title'
+    assert items[0]['date_modified'] == SEEN_AT
+
+
+def test_merge_normalises_old_local_offsets():
+    existing = [{'id': 'urn:test:1', 'url': None, 'title': 'Title', 'summary': None, 'tags': ['news'],
+                 'date_published': '2026-07-01T10:00:00+01:00', 'date_modified': '2026-07-01T10:00:00+01:00'}]
+    items, changed = _merge_feed_items(existing, [item(1, '2026-07-01T09:00:00+00:00')])
+    assert not changed
+    assert items[0]['date_published'] == '2026-07-01T09:00:00+00:00'
+
+
+def test_merge_keeps_the_newest_items(monkeypatch):
+    monkeypatch.setattr(generate_htmls, 'FEED_MAX_ITEMS', 2)
+    items, _ = _merge_feed_items([], [item(n, f"2026-03-0{n}T00:00:00+00:00") for n in (1, 2, 3)])
+    assert [i['id'] for i in items] == ['urn:test:3', 'urn:test:2']
+
+
+@pytest.fixture
+def feeds_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(generate_htmls, 'FEEDS_DIR', str(tmp_path))
+    monkeypatch.setattr(generate_htmls, 'FEED_INDEX_FILE', str(tmp_path / 'index.json'))
+    return tmp_path
+
+
+def feed(items):
+    return [{'id': '10', 'name': 'Ten', 'filename': '10.html', 'feed_items': items}]
+
+
+def test_feed_updated_is_when_items_changed(feeds_dir):
+    generate_htmls.write_feeds(feed([item(1, '2026-03-02T00:00:00+00:00')]), '2026-03-02T12:00:00+00:00')
+    written = (feeds_dir / '10.json').read_bytes()
+    assert json.loads(written)['_updated'] == '2026-03-02T12:00:00+00:00'
+
+    # Same items: nothing is rewritten
+    generate_htmls.write_feeds(feed([item(1, '2026-03-02T00:00:00+00:00')]), '2026-03-03T12:00:00+00:00')
+    assert (feeds_dir / '10.json').read_bytes() == written
+
+    # An item that turns up late, dated before the others, still moves updated
+    generate_htmls.write_feeds(feed([item(2, '2026-02-20T00:00:00+00:00')]), '2026-03-04T12:00:00+00:00')
+    assert json.loads((feeds_dir / '10.json').read_text())['_updated'] == '2026-03-04T12:00:00+00:00'
+    index = json.loads((feeds_dir / 'index.json').read_text())
+    assert index['updated'] == '2026-03-04T12:00:00+00:00'
+    assert index['feeds'][0]['items'] == 2
+    assert (feeds_dir / '10.xml').exists()
+
+
+def test_committee_feeds_skip_committees_without_content():
+    data = {
+        'metadata': {'extracted_at': SEEN_AT},
+        'events': [],
+        'publications': [{'id': 2, 'committee': {'id': 10}, 'description': 'Report',
+                          'publicationStartDate': '2026-03-02T00:00:00'}],
+        'news': [],
+    }
+    feeds = generate_htmls.committee_feeds(data, {'10': 'Ten', '11': 'Eleven'})
+    assert [f['id'] for f in feeds] == ['10']
+    assert feeds[0]['feed_items'][0]['id'] == 'urn:parliament-committees:publication:2'
+    assert feeds[0]['feed_items'][0]['_seen_at'] == SEEN_AT
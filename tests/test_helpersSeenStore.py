@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import helpersSeenStore
+from helpersSeenStore import SeenStore
+
+DATA = {
+    'metadata': {'extracted_at': '2026-03-03T12:00:00+00:00'},
+    'events': [{'id': 1, 'committees': [{'id': 10}, {'id': 11}]}],
+    'publications': [{'id': 2, 'committee': {'id': 10}}],
+    'news': [{'id': 3, 'source_committee_id': 11}],
+}
+
+
+@pytest.fixture
+def store(tmp_path):
+    with SeenStore(str(tmp_path / 'delivered.sqlite')) as store:
+        yield store
+
+
+def test_nothing_dropped_when_nothing_delivered(store):
+    data, dropped = store.filter_undelivered(DATA)
+    assert data['events'] == DATA['events']
+    assert data['publications'] == DATA['publications']
+    assert data['news'] == DATA['news']
+    assert dropped == {'event': 0, 'publication': 0, 'news': 0}
+
+
+def test_delivered_items_are_dropped_per_committee(store):
+    store.mark_delivered(10, [('event', '1'), ('publication', '2')])
+    data, dropped = store.filter_undelivered(DATA)
+    # The joint event stays for the committee that has not had it
+    assert data['events'] == [{'id': 1, 'committees': [{'id': 11}]}]
+    assert data['publications'] == []
+    assert data['news'] == DATA['news']
+    assert dropped == {'event': 1, 'publication': 1, 'news': 0}
+    assert data['metadata'] == DATA['metadata']
+
+
+def test_mark_sent_records_only_sent_pages(store):
+    page_items = {10: [('publication', '2')], 11: [('news', '3')]}
+    assert store.mark_sent(page_items, {10: 'sent', 11: 'error'}) == 1
+    assert store.delivered() == {(10, 'publication', '2')}
+    assert store.delivered([11]) == set()
+
+
+def test_old_rows_are_evicted(store):
+    now = datetime(2026, 3, 3, tzinfo=timezone.utc)
+    store.mark_delivered(10, [('news', '3')], now=now - store.retention - timedelta(days=1))
+    store.mark_delivered(10, [('news', '4')], now=now)
+    assert store.evict(now) == 1
+    assert store.delivered() == {(10, 'news', '4')}
+
+
+def test_delivered_survives_reopening(tmp_path):
+    path = str(tmp_path / 'delivered.sqlite')
+    with SeenStore(path) as store:
+        store.mark_delivered(10, [('news', '3')])
+    with SeenStore(path) as store:
+        assert store.delivered() == {(10, 'news', '3')}
+
+
+def test_enabled(monkeypatch):
+    monkeypatch.delenv('SEEN_STORE', raising=False)
+    assert helpersSeenStore.enabled()
+    monkeypatch.setenv('SEEN_STORE', '0')
+    assert not helpersSeenStore.enabled()
@@ -0,0 +1,55 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from helpersSendLedger import STAGE_CONTENT_UPLOADED, STAGE_CREATED, STAGE_SENT, SendLedger, current_week
+
+
+def test_current_week_is_iso_week():
+    assert current_week(datetime(2026, 3, 2, tzinfo=timezone.utc)) == "2026-W10"
+    assert current_week(datetime(2027, 1, 1, tzinfo=timezone.utc)) == "2026-W53"
+
+
+def test_make_key_changes_with_content_and_week():
+    key = SendLedger.make_key(12, "<p>a</p>", week="2026-W10")
+    assert key.startswith("12:2026-W10:")
+    assert SendLedger.make_key(12, b"<p>a</p>", week="2026-W10") == key
+    assert SendLedger.make_key(12, "<p>b</p>", week="2026-W10") != key
+    assert SendLedger.make_key(12, "<p>a</p>", week="2026-W11") != key
+
+
+def test_record_is_kept_across_reloads(tmp_path):
+    path = str(tmp_path / "ledger.jsonl")
+    ledger = SendLedger(path)
+    ledger.record("k", STAGE_CREATED, "c1")
+    ledger.record("k", STAGE_CONTENT_UPLOADED, "c1")
+    assert not ledger.is_sent("k")
+
+    ledger.record("k", STAGE_SENT, "c1", interest_id="i1")
+    reloaded = SendLedger(path)
+    assert reloaded.is_sent("k")
+    assert reloaded.latest("k")["interest_id"] == "i1"
+    assert reloaded.latest("other") is None
+
+
+def test_load_keeps_the_most_advanced_stage(tmp_path):
+    path = str(tmp_path / "ledger.jsonl")
+    ledger = SendLedger(path)
+    ledger.record("k", STAGE_CONTENT_UPLOADED, "c1")
+    ledger.record("k", STAGE_CREATED, "c2")
+    assert SendLedger(path).latest("k")["stage"] == STAGE_CONTENT_UPLOADED
+
+
+def test_load_skips_a_torn_last_line(tmp_path):
+    path = tmp_path / "ledger.jsonl"
+    SendLedger(str(path)).record("k", STAGE_SENT, "c1")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"key": "j", "sta')
+    ledger = SendLedger(str(path))
+    assert ledger.is_sent("k")
+    assert ledger.latest("j") is None
+
+
+def test_record_rejects_unknown_stage(tmp_path):
+    with pytest.raises(ValueError):
+        SendLedger(str(tmp_path / "ledger.jsonl")).record("k", "scheduled", "c1")
@@ -0,0 +1,77 @@
+import pytest
+
+import helpersShards
+from helpersCSVMapping import MappingRow
+
+
+@pytest.fixture(autouse=True)
+def in_tmp_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+
+@pytest.mark.parametrize('value, expected', [('1/1', (1, 1)), ('3/4', (3, 4))])
+def test_parse_shard(value, expected):
+    assert helpersShards.parse_shard(value) == expected
+
+
+@pytest.mark.parametrize('value', ['0/4', '5/4', '1/0', '2', 'a/b', '1/2/3'])
+def test_parse_shard_rejects(value):
+    with pytest.raises(ValueError):
+        helpersShards.parse_shard(value)
+
+
+def test_shards_cover_every_committee_once():
+    rows = [MappingRow(cttee_id, f"C{cttee_id}", f"i{cttee_id}") for cttee_id in range(100, 160)]
+    shards = [helpersShards.shard_rows(rows, index, 4) for index in range(1, 5)]
+    assert sorted(row for shard in shards for row in shard) == sorted(rows)
+    assert all(shards)
+    # Stable across processes: CRC32, not the salted hash()
+    assert helpersShards.shard_for('123', 4) == helpersShards.shard_for(123, 4)
+
+
+def test_update_shard_report_merges_stages():
+    helpersShards.update_shard_report(1, 2, {'window': ['a', 'b'], 'committees': [1], 'timings': {'fetch': 1.0}})
+    helpersShards.update_shard_report(1, 2, {'outcomes': {'1': 'sent'}, 'timings': {'send': 2.0}})
+    report = helpersShards.load_shard_report(1, 2)
+    assert report['shard'] == '1/2'
+    assert report['committees'] == [1]
+    assert report['outcomes'] == {'1': 'sent'}
+    assert report['timings'] == {'fetch': 1.0, 'send': 2.0}
+
+
+def test_update_shard_report_drops_an_earlier_window():
+    helpersShards.update_shard_report(1, 2, {'window': ['a', 'b'], 'pages': [{'id': '1'}], 'timings': {'fetch': 1.0}})
+    helpersShards.update_shard_report(1, 2, {'window': ['c', 'd'], 'committees': [2], 'timings': {'render': 0.5}})
+    report = helpersShards.load_shard_report(1, 2)
+    assert 'pages' not in report
+    assert report['window'] == ['c', 'd']
+    assert report['timings'] == {'render': 0.5}
+
+
+def test_load_shard_reports_lists_missing():
+    helpersShards.update_shard_report(2, 3, {'committees': []})
+    reports, missing = helpersShards.load_shard_reports(3)
+    assert [r['shard'] for r in reports] == ['2/3']
+    assert missing == [1, 3]
+
+
+def test_merge_reports():
+    reports = [
+        {'shard': '1/2', 'window': ['a', 'b'], 'committees': [1, 2], 'pages': [{'id': '1'}],
+         'outcomes': {'1': 'sent', '2': 'no_content'}, 'timings': {'fetch': 1.0, 'send': 2.0}},
+        {'shard': '2/2', 'window': ['a', 'b'], 'committees': [3], 'pages': [{'id': '3'}, {'id': '4'}],
+         'outcomes': {'3': 'sent'}, 'timings': {'fetch': 4.0}},
+    ]
+    merged = helpersShards.merge_reports(reports, 2)
+    assert merged['committees'] == 3
+    assert merged['pages'] == 3
+    assert merged['outcomes'] == {'sent': 2, 'no_content': 1}
+    assert merged['wall_seconds'] == 4.0
+    assert merged['stage_seconds']['fetch'] == {'max': 4.0, 'total': 5.0}
+    assert [s['pages'] for s in merged['per_shard']] == [1, 2]
+
+
+def test_listings_round_trip():
+    assert helpersShards.load_listings() is None
+    helpersShards.save_listings({'metadata': {'houses': ['Commons']}, 'events': []})
+    assert helpersShards.load_listings()['events'] == []
@@ -0,0 +1,140 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import fetch_parliament_data
+import watchPipeline
+from watchPipeline import EVENTS_FEED, PUBLICATIONS_FEED, WatchState, news_feed
+
+NOW = datetime(2026, 3, 3, 12, tzinfo=timezone.utc)
+
+
+def make_state(tmp_path):
+    return WatchState(str(tmp_path / 'watch_state.json'), timedelta(minutes=5), timedelta(hours=6))
+
+
+def test_first_poll_is_a_baseline(tmp_path):
+    state = make_state(tmp_path)
+    assert state.new_ids('events', [1, 2]) == []
+    state.record_poll('events', [1, 2], found_new=False, now=NOW)
+    assert state.new_ids('events', [1, 2, 3]) == [3]
+
+
+def test_interval_speeds_up_and_slows_down_within_bounds(tmp_path):
+    state = make_state(tmp_path)
+    start = state.feed('events')['interval']
+    state.record_poll('events', [], found_new=True, now=NOW)
+    assert state.feed('events')['interval'] == start * watchPipeline.SPEED_UP
+    for _ in range(20):
+        state.record_poll('events', [], found_new=True, now=NOW)
+    assert state.feed('events')['interval'] == 5 * 60
+    for _ in range(20):
+        state.record_poll('events', [], found_new=False, now=NOW)
+    assert state.feed('events')['interval'] == 6 * 3600
+    assert state.due(NOW) == []
+    assert state.due(NOW + timedelta(hours=6)) == ['events']
+
+
+def test_old_seen_ids_are_forgotten(tmp_path):
+    state = make_state(tmp_path)
+    state.record_poll('events', [1], found_new=False, now=NOW)
+    later = NOW + watchPipeline.SEEN_RETENTION + timedelta(days=1)
+    state.record_poll('events', [2], found_new=False, now=later)
+    assert set(state.feed('events')['seen']) == {'2'}
+
+
+def test_state_round_trip(tmp_path):
+    state = make_state(tmp_path)
+    state.record_poll('events', [1], found_new=True, now=NOW)
+    state.save()
+    loaded = make_state(tmp_path)
+    loaded.load()
+    assert loaded.feeds == state.feeds
+
+
+def test_sync_feeds_follows_the_mapping(tmp_path):
+    state = make_state(tmp_path)
+    state.sync_feeds({10, 11})
+    state.sync_feeds({11})
+    assert set(state.feeds) == {EVENTS_FEED, PUBLICATIONS_FEED, news_feed(11)}
+
+
+def test_next_wakeup_without_a_schedule_is_not_now(tmp_path):
+    state = make_state(tmp_path)
+    state.sync_feeds({10})
+    assert state.next_wakeup(NOW) == NOW + timedelta(minutes=5)
+
+
+@pytest.fixture
+def watched(tmp_path, monkeypatch):
+    """A mapping of committees 10 and 11 whose news is served from news[cttee_id]."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('PIPELINE_HOUSES', 'Commons')
+    monkeypatch.setenv('SEEN_STORE', '0')
+    (tmp_path / 'mapping.csv').write_text("cttee_id,cttee_name,interest_id\n10,Ten,i10\n11,Eleven,i11\n")
+    news = {10: [], 11: []}
+
+    def fetch_news(cttee_id, since):
+        if news[cttee_id] is None:
+            raise OSError("unreachable")
+        return [dict(item, source_committee_id=cttee_id) for item in news[cttee_id]]
+
+    monkeypatch.setattr(fetch_parliament_data, 'fetch_house_events', lambda *args: [])
+    monkeypatch.setattr(fetch_parliament_data, 'fetch_publications', lambda *args: [])
+    monkeypatch.setattr(fetch_parliament_data, 'fetch_news', fetch_news)
+    state = make_state(tmp_path)
+    watchPipeline.cycle(state, now=NOW)  # baseline
+    return state, news
+
+
+def news_item(item_id):
+    return {'id': item_id, 'heading': f"Item {item_id}", 'url': f"/news/{item_id}",
+            'teaser': '', 'datePublished': '2026-03-03T09:00:00'}
+
+
+def test_failed_poll_is_backed_off(watched):
+    state, news = watched
+    news[10] = None
+    later = NOW + timedelta(hours=1)
+    watchPipeline.cycle(state, now=later)
+    assert news_feed(10) not in state.due(later)
+    assert state.next_wakeup(later) > later
+
+
+def test_dry_run_leaves_new_items_to_the_next_poll(watched):
+    state, news = watched
+    news[10] = [news_item(1)]
+    later = NOW + timedelta(hours=1)
+    assert watchPipeline.cycle(state, now=later, dry_run=True) == {}
+    assert state.new_ids(news_feed(10), [1]) == [1]
+
+
+def test_only_delivered_items_are_marked_seen(watched, monkeypatch):
+    state, news = watched
+    news[10] = [news_item(1)]
+    news[11] = [news_item(2)]
+    dispatched = []
+
+    def dispatch(new, rows, dry_run=False):
+        dispatched.append(sorted(row.cttee_id for row in rows))
+        return {10: 'sent', 11: 'error'}
+
+    monkeypatch.setattr(watchPipeline, 'dispatch', dispatch)
+    later = NOW + timedelta(hours=1)
+    watchPipeline.cycle(state, now=later)
+    assert dispatched == [[10, 11]]
+    assert state.new_ids(news_feed(10), [1]) == []
+    assert state.new_ids(news_feed(11), [2]) == [2]
+
+
+def test_failed_dispatch_marks_nothing(watched, monkeypatch):
+    state, news = watched
+    news[10] = [news_item(1)]
+
+    def dispatch(new, rows, dry_run=False):
+        raise RuntimeError("MailChimp is down")
+
+    monkeypatch.setattr(watchPipeline, 'dispatch', dispatch)
+    later = NOW + timedelta(hours=1)
+    assert watchPipeline.cycle(state, now=later) == {}
+    assert state.new_ids(news_feed(10), [1]) == [1]
@@ -0,0 +1,316 @@
+"""
+Watches the parliament feeds and sends an alert as soon as a committee has
+something new, instead of waiting for the weekly run.
+
+    python watchPipeline.py                 # poll until stopped (Ctrl-C / SIGTERM)
+    python watchPipeline.py --once          # one poll of every due feed, e.g. from cron
+    python watchPipeline.py --dry-run       # detect and render, but do not send
+
+The Events and Publications listings (across every mapped house, see
+runPipeline) and each committee's news are polled as separate feeds. The
+ids already seen in each feed are kept in watch_state.json, so only new
+items are rendered, and only the committees they belong to get an email.
+The first poll of a feed just records what is already there. An item only
+counts as seen once every committee it belongs to was sent it, so a failed
+send, or a --dry-run, leaves it to be picked up again.
+
+Each feed has its own polling interval: it halves when a poll finds
+something new and grows by half when it does not, or when the poll fails,
+between --min-interval and --max-interval, so quiet committees (and
+unreachable endpoints) are polled less often.
+
+--metrics DIR refreshes a JSON report and a Prometheus textfile there after
+every cycle; counters accumulate for the life of the process.
+"""
+import argparse
+import json
+import logging
+import os
+import signal
+import threading
+from datetime import datetime, timedelta, timezone
+
+import helpersCSVMapping
+import helpersFiles
+import helpersMetrics
+import helpersProfile
+import helpersSeenStore
+import fetch_parliament_data
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = 'watch_state.json'
+MIN_INTERVAL = timedelta(minutes=5)
+MAX_INTERVAL = timedelta(hours=6)
+START_INTERVAL = timedelta(minutes=30)
+SPEED_UP = 0.5   # interval multiplier after a poll that found new items
+SLOW_DOWN = 1.5  # ... and after one that did not
+# Items older than the fetch window can no longer be returned, so their ids can be forgotten
+SEEN_RETENTION = timedelta(days=fetch_parliament_data.WINDOW_DAYS + 2)
+
+EVENTS_FEED = 'events'
+PUBLICATIONS_FEED = 'publications'
+
+def news_feed(cttee_id) -> str:
+    return f"news:{cttee_id}"
+
+class WatchState:
+    """
+    Per-feed polling schedule and seen item ids, saved as JSON.
+
+    feeds[name] = {"interval": seconds, "next_due": iso, "last_new": iso or None,
+                   "seen": {item id: first seen iso}}
+    """
+
+    def __init__(self, filepath: str = STATE_FILE, min_interval: timedelta = MIN_INTERVAL,
+                 max_interval: timedelta = MAX_INTERVAL):
+        self.filepath = filepath
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.feeds = {}
+
+    def load(self) -> None:
+        if os.path.exists(self.filepath):
+            with open(self.filepath, 'r', encoding='utf-8') as f:
+                self.feeds = json.load(f).get('feeds', {})
+
+    def save(self) -> None:
+        with helpersFiles.atomic_write(self.filepath, 'w', encoding='utf-8') as f:
+            json.dump({'feeds': self.feeds}, f, indent=1)
+
+    def feed(self, name: str) -> dict:
+        return self.feeds.setdefault(name, {
+            'interval': START_INTERVAL.total_seconds(),
+            'next_due': None,
+            'last_new': None,
+            'seen': None,  # None until the first poll has taken a baseline
+        })
+
+    def sync_feeds(self, cttee_ids) -> None:
+        """Adds news feeds for newly mapped committees and drops unmapped ones."""
+        wanted = {EVENTS_FEED, PUBLICATIONS_FEED} | {news_feed(c) for c in cttee_ids}
+        for name in wanted:
+            self.feed(name)
+        for name in set(self.feeds) - wanted:
+            del self.feeds[name]
+
+    def due(self, now: datetime) -> list:
+        return [name for name, feed in self.feeds.items()
+                if feed['next_due'] is None or datetime.fromisoformat(feed['next_due']) <= now]
+
+    def next_wakeup(self, now: datetime) -> datetime:
+        """When the next feed is due; feeds with no schedule yet are picked up by the next cycle anyway."""
+        due_times = [datetime.fromisoformat(f['next_due']) for f in self.feeds.values() if f['next_due']]
+        return min(due_times, default=now + self.min_interval)
+
+    def new_ids(self, name: str, ids) -> list:
+        """The ids not seen in this feed before; all of them count as seen on a baseline poll."""
+        seen = self.feed(name)['seen']
+        if seen is None:
+            return []
+        return [i for i in ids if str(i) not in seen]
+
+    def record_poll(self, name: str, ids, found_new: bool, now: datetime) -> None:
+        """Marks ids as seen, forgets old ones and schedules the feed's next poll."""
+        feed = self.feed(name)
+        seen = feed['seen'] or {}
+        stamp = now.isoformat()
+        for i in ids:
+            seen.setdefault(str(i), stamp)
+        cutoff = now - SEEN_RETENTION
+        feed['seen'] = {i: t for i, t in seen.items() if datetime.fromisoformat(t) >= cutoff}
+
+        if found_new:
+            feed['last_new'] = stamp
+        self._reschedule(feed, SPEED_UP if found_new else SLOW_DOWN, now)
+
+    def record_failure(self, name: str, now: datetime) -> None:
+        """Backs a feed off after a failed poll, so an outage is not polled in a tight loop. Seen ids are kept."""
+        self._reschedule(self.feed(name), SLOW_DOWN, now)
+
+    def _reschedule(self, feed: dict, factor: float, now: datetime) -> None:
+        interval = feed['interval'] * factor
+        interval = max(self.min_interval.total_seconds(), min(self.max_interval.total_seconds(), interval))
+        feed['interval'] = interval
+        feed['next_due'] = (now + timedelta(seconds=interval)).isoformat()
+
+def poll(state: WatchState, registry, now: datetime) -> tuple:
+    """
+    Polls every due feed once. A feed whose fetch fails is backed off.
+
+    Returns (new data in the fetch_data layout, {feed: items polled}).
+    Nothing is marked seen here, so items are picked up again if the
+    dispatch that follows fails.
+    """
+    allowed_ids = registry.cttee_ids()
+    today, since = fetch_parliament_data.date_window(now)
+    start_date, end_date = since.strftime('%Y-%m-%d'), today.strftime('%Y-%m-%d')
+    new = {
+        "metadata": {"extracted_at": today.isoformat(), "range": [start_date, end_date]},
+        "events": [],
+        "publications": [],
+        "news": [],
+    }
+    polled = {}
+
+    for name in state.due(now):
+        try:
+            if name == EVENTS_FEED:
+                items = fetch_parliament_data.filter_events(
+                    fetch_parliament_data.fetch_house_events(start_date, end_date, registry.houses), allowed_ids)
+                key = "events"
+            elif name == PUBLICATIONS_FEED:
+                items = fetch_parliament_data.filter_publications(
+                    fetch_parliament_data.fetch_publications(start_date, end_date), allowed_ids)
+                key = "publications"
+            else:
+                items = fetch_parliament_data.fetch_news(int(name.split(':', 1)[1]), since)
+                key = "news"
+        except (OSError, ValueError) as e:  # network errors and bad JSON: try again later
+            logger.warning("Polling %s failed: %s", name, e)
+            state.record_failure(name, now)
+            continue
+
+        fresh = set(state.new_ids(name, [item['id'] for item in items]))
+        new[key].extend(item for item in items if item['id'] in fresh)
+        polled[name] = items
+        if fresh:
+            logger.info("%s: %d new item(s).", name, len(fresh))
+
+    return new, polled
+
+def item_committees(item: dict) -> set:
+    """The committee ids a news item, publication or (possibly joint) event belongs to."""
+    if 'source_committee_id' in item:
+        return {item['source_committee_id']}
+    if 'committee' in item:
+        return {(item['committee'] or {}).get('id')}
+    return {c.get('id') for c in item.get('committees', [])}
+
+def affected_committees(new: dict, registry) -> list:
+    """The mapping rows of committees that have at least one new item."""
+    cttee_ids = set()
+    for key in ('events', 'publications', 'news'):
+        for item in new[key]:
+            cttee_ids |= item_committees(item)
+    return [row for row in registry if row.cttee_id in cttee_ids]
+
+def dispatch(new: dict, rows: list, dry_run: bool = False) -> dict:
+    """
+    Adds the new items to the affected committees' feeds, then renders a
+    page of just the new items for each and sends it. Items the weekly run
+    (or an earlier alert) already delivered are left out of the pages, and
+    sent items are recorded so the weekly run skips them.
+    """
+    import generate_htmls
+
+    committees_map = {str(row.cttee_id): row.cttee_name for row in rows}
+    if not dry_run:
+        # The feeds get every new item, whether or not it is emailed below
+        generate_htmls.write_feeds(generate_htmls.committee_feeds(new, committees_map),
+                                   new['metadata']['extracted_at'])
+
+    store = helpersSeenStore.SeenStore() if helpersSeenStore.enabled() else None
+    try:
+        if store is not None:
+            new, dropped = store.filter_undelivered(new)
+            helpersSeenStore.report_dropped(dropped)
+        pages = generate_htmls.render_pages(new, committees_map)
+        if dry_run:
+            for page in pages:
+                print(f"Would send {len(page['html'])} bytes to {page['name']} ({page['id']}).")
+            return {}
+
+        import sendUpdates
+        outcomes = sendUpdates.send_pages({int(page['id']): page['html'] for page in pages}, rows)
+        if store is not None:
+            sendUpdates.mark_delivered(store, outcomes, {int(page['id']): page['items'] for page in pages})
+        return outcomes
+    finally:
+        if store is not None:
+            store.close()
+
+def cycle(state: WatchState, now: datetime = None, dry_run: bool = False) -> dict:
+    """Polls what is due, dispatches alerts and updates the state. Returns send outcomes."""
+    now = now or datetime.now(timezone.utc)
+    registry = helpersCSVMapping.get_pipeline_registry()
+    if not registry.exists:
+        print(f"Error: {registry.filepath} not found.")
+        return {}
+    state.sync_feeds(registry.cttee_ids())
+
+    new, polled = poll(state, registry, now)
+    rows = affected_committees(new, registry)
+    outcomes = {}
+    if rows:
+        try:
+            outcomes = dispatch(new, rows, dry_run)
+        except Exception:  # keep watching; nothing in this cycle counts as delivered
+            logger.exception("Dispatching alerts failed.")
+    # A dry run, or a dispatch that failed outright, delivers nothing
+    undelivered = {row.cttee_id for row in rows}
+    if outcomes:
+        undelivered = {c for c, outcome in outcomes.items() if outcome not in ('sent', 'no_content')}
+
+    # New items are marked seen only once every committee they belong to got
+    # them, so failed sends and dry runs are picked up again next poll
+    for name, items in polled.items():
+        ids = [item['id'] for item in items]
+        fresh = set(state.new_ids(name, ids))
+        marked = [item['id'] for item in items
+                  if item['id'] not in fresh or not item_committees(item) & undelivered]
+        state.record_poll(name, marked, found_new=bool(fresh), now=now)
+    state.save()
+    return outcomes
+
+def export_metrics(directory: str) -> None:
+    helpersMetrics.export(os.path.join(directory, 'watch_report.json'), os.path.join(directory, 'mcapi_watch.prom'))
+
+def watch(state: WatchState, dry_run: bool = False, stop: threading.Event = None, metrics_dir: str = None) -> None:
+    """Runs poll cycles until stop is set, sleeping until the next feed is due."""
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        outcomes = cycle(state, dry_run=dry_run)
+        if outcomes:
+            print(f"Alerts: {outcomes}")
+        if metrics_dir:
+            export_metrics(metrics_dir)
+        now = datetime.now(timezone.utc)
+        wait = (state.next_wakeup(now) - now).total_seconds()
+        logger.info("Next poll in %.0fs.", max(wait, 0))
+        stop.wait(max(wait, 1))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Poll the parliament feeds and send alerts for new items.")
+    parser.add_argument("--once", action="store_true", help="Run one poll cycle and exit.")
+    parser.add_argument("--dry-run", action="store_true", help="Render alerts but do not send them.")
+    parser.add_argument("--state", default=STATE_FILE, help=f"State file (default {STATE_FILE}).")
+    parser.add_argument("--min-interval", type=float, default=MIN_INTERVAL.total_seconds() / 60,
+                        help="Shortest polling interval per feed, in minutes.")
+    parser.add_argument("--max-interval", type=float, default=MAX_INTERVAL.total_seconds() / 60,
+                        help="Longest polling interval per feed, in minutes.")
+    parser.add_argument("--metrics", metavar="DIR", help="Write a JSON report and Prometheus textfile to DIR.")
+    helpersProfile.add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    profiler = helpersProfile.profiler_from_args(args)
+
+    state = WatchState(args.state, timedelta(minutes=args.min_interval), timedelta(minutes=args.max_interval))
+    state.load()
+
+    if args.once:
+        with helpersProfile.stage(profiler, "watch"):
+            cycle(state, dry_run=args.dry_run)
+        if args.metrics:
+            export_metrics(args.metrics)
+        return
+
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+    # Profiles the whole session; reports are written when it is stopped
+    with helpersProfile.stage(profiler, "watch"):
+        watch(state, args.dry_run, stop, args.metrics)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()